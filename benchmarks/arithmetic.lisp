@@ -0,0 +1,17 @@
+;; Pricing-rule style arithmetic: many small calls with several operands
+(define (price base qty rate discount)
+    (- (* base qty (+ 1 rate)) (* discount qty) (/ base 100) 1))
+(define (total n acc)
+    (if (= n 0)
+        acc
+        (total (- n 1) (+ acc (price 12.5 n 0.2 0.5) (price 3 2 0.1 0) 1 2))))
+(print (total 20000 0))
+
+;; Bulk numeric work on vectors
+(define prices (list->f64vector (range 1 10000)))
+(define weights (list->f64vector (map (lambda (x) (/ x 10000)) (range 1 10000))))
+(define (repeat n)
+    (if (= n 0)
+        0
+        (begin (vector-dot prices weights) (vector-sum prices) (repeat (- n 1)))))
+(repeat 100)
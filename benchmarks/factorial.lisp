@@ -0,0 +1,34 @@
+;; The factorial variants from the README, each run many times
+
+;; Non-tail recursion
+(define (factorial n)
+    (if (< n 2)
+        1
+        (* n (factorial (-- n)))))
+
+;; Tail recursion through a local loop
+(define (tail-factorial n)
+    (define (loop acc x)
+        (if (< x 2)
+            acc
+            (loop (* x acc) (- x 1))))
+    (loop 1 n))
+
+;; Folds over a list
+(define (fold-factorial n)
+    (foldl * 1 (range 1 n)))
+
+(define (product-factorial n)
+    (product (range 1 n)))
+
+(define (repeat n thunk)
+    (if (> n 0)
+        (begin
+            (thunk)
+            (repeat (-- n) thunk))
+        nil))
+
+(repeat 300 (lambda () (factorial 100)))
+(repeat 300 (lambda () (tail-factorial 100)))
+(repeat 300 (lambda () (fold-factorial 100)))
+(repeat 300 (lambda () (product-factorial 100)))
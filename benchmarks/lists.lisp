@@ -0,0 +1,12 @@
+;; List pipelines built from map, filter and foldl with closures
+(define (square x) (* x x))
+(define (even? x) (= 0 (mod x 2)))
+
+(define numbers (range 1 20000))
+
+(foldl + 0 (map square (filter even? numbers)))
+(length (filter (lambda (x) (> x 100)) (map (lambda (x) (mod x 1000)) numbers)))
+(foldl (lambda (acc x) (cons x acc)) nil numbers)
+(reverse (zip numbers (reverse numbers)))
+(sum (take 10000 (drop 5000 numbers)))
+(max (map square numbers))
@@ -0,0 +1,77 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+'''
+Micro-benchmark for the list primitives. Compares the current car, cdr,
+cons, splits and append against the same functions wrapped the way they used
+to be, by a generic type_check decorator. Run from the repository root:
+
+    python3 benchmarks/primitives.py
+'''
+
+import os
+import sys
+import timeit
+from functools import wraps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.primitives import NIL, Pair, car, cdr, cons, splits, append, to_list
+
+LIST_TYPES = (Pair, tuple)
+
+def type_check(*arg_types, **kw_types):
+    """The decorator every list primitive used to go through"""
+    def make_decorator(function):
+        @wraps(function)
+        def checked(*args, **kwargs):
+            if len(args) != len(arg_types):
+                raise TypeError("Wrong number of positional arguments")
+            for arg, type in zip(args, arg_types):
+                if not isinstance(arg, type):
+                    raise TypeError("Wrong argument type")
+            for key, value in kwargs.items():
+                if key in kw_types and not isinstance(value, kw_types[key]):
+                    raise TypeError("Wrong argument type")
+            return function(*args, **kwargs)
+        return checked
+    return make_decorator
+
+wrapped = {
+    'car': type_check(LIST_TYPES)(car),
+    'cdr': type_check(LIST_TYPES)(cdr),
+    'cons': type_check(object, LIST_TYPES)(cons),
+    'splits': type_check(LIST_TYPES)(splits),
+    'append': type_check(LIST_TYPES, LIST_TYPES)(append),
+}
+
+current = {
+    'car': car,
+    'cdr': cdr,
+    'cons': cons,
+    'splits': splits,
+    'append': append,
+}
+
+ls = to_list(tuple(range(3)))
+code = (1, 2, 3)
+calls = {
+    'car': lambda f: f(ls),
+    'cdr': lambda f: f(ls),
+    'cons': lambda f: f(0, ls),
+    'splits': lambda f: f(code),
+    'append': lambda f: f(ls, NIL),
+}
+
+def best(call, function, number):
+    return min(timeit.repeat(lambda: call(function), number=number, repeat=5))
+
+def main(number=200000):
+    print('{:<8} {:>12} {:>12} {:>8}'.format('name', 'wrapped ns', 'direct ns', 'speedup'))
+    for name in sorted(calls):
+        before = best(calls[name], wrapped[name], number) / number * 1e9
+        after = best(calls[name], current[name], number) / number * 1e9
+        print('{:<8} {:>12.1f} {:>12.1f} {:>7.1f}x'.format(name, before, after, before / after))
+
+if __name__ == '__main__':
+    main()
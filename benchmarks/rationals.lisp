@@ -0,0 +1,19 @@
+;; Exact arithmetic through the rational functions in src/rationals.lisp
+
+;; Partial sums of the harmonic series
+(define (harmonic n)
+    (define (loop acc k)
+        (if (> k n)
+            acc
+            (loop (rational+ acc (rational 1 k)) (++ k))))
+    (loop 0 1))
+
+;; Newton's method for the square root of 2
+(define (newton x steps)
+    (if (= steps 0)
+        x
+        (newton (rational/ (rational+ x (rational/ 2 x)) 2) (-- steps))))
+
+(harmonic 2000)
+(newton 1 12)
+(foldl rational* 1 (map (lambda (k) (rational k (++ k))) (range 1 2000)))
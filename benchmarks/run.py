@@ -0,0 +1,183 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+'''
+Benchmark suite for the interpreter. Every .lisp file in this directory is a
+benchmark: its forms are parsed once and then evaluated in a fresh copy of
+the global environment. The 'parse' benchmark only parses a large generated
+program. Run from anywhere:
+
+    python3 benchmarks/run.py                  # run and compare to baseline
+    python3 benchmarks/run.py --save           # run and store a new baseline
+    python3 benchmarks/run.py tail lists       # run some benchmarks
+    python3 benchmarks/run.py --engine=vm      # run on the bytecode engine
+
+For each benchmark the runner reports the best wall-clock time over several
+repeats, the peak memory traced by tracemalloc during one extra run, and the
+number of memory blocks still allocated after that run that were not before
+('leftover'). Leftover blocks point to leaks and caches; they are not a count
+of the allocations made during the run. Times and peaks are compared to the
+JSON baseline, and the runner exits with status 1 if any of them regressed
+by more than the threshold.
+'''
+
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+# The library loads files relative to the repository root
+os.chdir(ROOT)
+
+from src.eval import select_engine
+from src.operators import global_env
+from src.parsers import parse_file
+from src.primitives import Environment
+
+BASELINE = os.path.join(HERE, 'baseline.json')
+
+clock = getattr(time, 'perf_counter', time.time)
+
+def generated_program(forms=5000):
+    '''Text of a large program for the parse benchmark'''
+    out = io.StringIO()
+    for i in range(forms):
+        out.write(
+            ';; definition {0}\n'
+            '(define (f{0} x)\n'
+            '    (if (< x 2)\n'
+            '        (list 1 2.5 "string" \'quoted 3/4)\n'
+            '        [* x (f{0} (- x 1))]))\n'.format(i)
+        )
+    return out.getvalue()
+
+def lisp_benchmark(path, eval):
+    '''Evaluate the forms in path in a fresh environment'''
+    with open(path) as stream:
+        forms = list(parse_file(stream))
+    def run():
+        env = Environment(scope=global_env)
+        for form in forms:
+            eval(form, env)
+    return run
+
+def parse_benchmark():
+    '''Parse a generated program without evaluating it'''
+    text = generated_program()
+    def run():
+        for _ in parse_file(io.StringIO(text)):
+            pass
+    return run
+
+def benchmarks(eval):
+    '''Map benchmark name to a function running it once with eval'''
+    found = {'parse': parse_benchmark()}
+    for name in sorted(os.listdir(HERE)):
+        if name.endswith('.lisp'):
+            found[name[:-len('.lisp')]] = lisp_benchmark(os.path.join(HERE, name), eval)
+    return found
+
+def quietly(run):
+    '''Run without letting lisp output reach the terminal'''
+    stdout, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        run()
+    finally:
+        sys.stdout = stdout
+
+def measure(run, repeat):
+    '''Best time over repeats, then peak memory and blocks left allocated
+       by one traced run'''
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = clock()
+        quietly(run)
+        times.append(clock() - start)
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    quietly(run)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    return {
+        'time': min(times),
+        'peak': peak,
+        'leftover': sys.getallocatedblocks() - blocks,
+    }
+
+def compare(name, result, baseline, threshold):
+    '''List regressions of result against the baseline'''
+    old = baseline.get(name)
+    if old is None:
+        return []
+    regressions = []
+    for key in ('time', 'peak'):
+        if old[key] and result[key] > old[key] * (1 + threshold):
+            regressions.append('{} {} {:+.0%}'.format(
+                name, key, result[key] / old[key] - 1))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run interpreter benchmarks')
+    parser.add_argument('names', nargs='*', help='benchmarks to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='store results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.10,
+        help='allowed slowdown or memory growth as a fraction (default 0.10)')
+    parser.add_argument('--output', help='also write results to this JSON file')
+    parser.add_argument('--engine', choices=('eval', 'vm'), default='eval',
+        help='evaluate with the analyzer or the bytecode engine')
+    args = parser.parse_args()
+
+    eval, load = select_engine(args.engine)
+    load('src/library.lisp', global_env)
+    available = benchmarks(eval)
+    names = args.names or sorted(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        parser.error('unknown benchmarks: {}'.format(', '.join(unknown)))
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+
+    results, regressions = {}, []
+    print('{:<12} {:>10} {:>10} {:>10} {:>10}'.format(
+        'benchmark', 'time (s)', 'baseline', 'peak KiB', 'leftover'))
+    for name in names:
+        result = results[name] = measure(available[name], args.repeat)
+        old = baseline.get(name, {}).get('time')
+        print('{:<12} {:>10.4f} {:>10} {:>10.1f} {:>10}'.format(
+            name, result['time'], '-' if old is None else '{:.4f}'.format(old),
+            result['peak'] / 1024.0, result['leftover']))
+        regressions.extend(compare(name, result, baseline, args.threshold))
+
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2, sort_keys=True)
+    if args.save:
+        with open(args.baseline, 'w') as stream:
+            json.dump(results, stream, indent=2, sort_keys=True)
+        print('Saved baseline to {}'.format(args.baseline))
+    if regressions:
+        print('Regressions over {:.0%}:'.format(args.threshold))
+        for regression in regressions:
+            print('  ' + regression)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
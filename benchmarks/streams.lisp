@@ -0,0 +1,4 @@
+;; Lazy pipeline over a long range; memory should not grow with its length
+(define (square x) (* x x))
+(define (even? x) (= 0 (mod x 2)))
+(print (stream-foldl + 0 (stream-map square (stream-filter even? (stream-range 1 100000)))))
@@ -0,0 +1,14 @@
+;; Deep mutual tail recursion, as in examples/even.lisp. Every step is a tail
+;; call, so this measures the trampoline.
+(define (even x)
+    (cond [(< x 0) (odd (++ x))]
+          [(> x 0) (odd (-- x))]
+          [#t #t]))
+
+(define (odd x)
+    (cond [(< x 0) (even (++ x))]
+          [(> x 0) (even (-- x))]
+          [#t #f]))
+
+(even 100000)
+(odd -100001)
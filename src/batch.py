@@ -0,0 +1,121 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Runs many scripts in parallel. A pool of worker processes each boot the
+interpreter once, then evaluate scripts one after another, every script in
+a fresh environment made from the preloaded globals so scripts cannot see
+each other's definitions. The output of each script is captured and sent
+back with the error that stopped it, if any, and the time it took.
+"""
+
+__all__ = ['scripts', 'isolated', 'run_script', 'run_batch']
+
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from functools import partial
+
+clock = getattr(time, 'perf_counter', time.time)
+
+class Result(object):
+    """Outcome of running one script"""
+    __slots__ = ('path', 'output', 'error', 'seconds')
+
+    def __init__(self, path, output, error, seconds):
+        self.path = path
+        self.output = output
+        self.error = error
+        self.seconds = seconds
+
+def scripts(directory):
+    """Every .lisp file under directory, in a stable order"""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        found.extend(os.path.join(root, name)
+                     for name in sorted(files) if name.endswith('.lisp'))
+    return found
+
+def worker_init():
+    """Load the library once per worker. Interrupts are left to the parent,
+       which stops the workers itself."""
+    from src.eval import boot
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    boot()
+
+def isolated(forms, limits=None):
+    """Evaluate forms in a fresh child of global_env, within the budget
+       'limits' (keyword arguments of budget.limited) if given, and return
+       the last value, everything printed, and the error that stopped them
+       or None"""
+    from src.budget import limited
+    from src.eval import eval
+    from src.operators import global_env
+    from src.primitives import Environment, NIL, Symbol, str_list, to_tuple
+
+    env = Environment(scope=global_env)
+    # eval passed as a value defines into this environment too, not globally
+    env[Symbol('EVAL')] = lambda expr: eval(to_tuple(expr), env)
+    value, output, error = NIL, io.StringIO(), None
+    stdout, sys.stdout = sys.stdout, output
+    try:
+        with limited(**(limits or {})):
+            for expr in forms:
+                value = eval(expr, env)
+    except Exception as e:
+        error = '{}: {}'.format(e.__class__.__name__, str_list(e))
+    finally:
+        sys.stdout = stdout
+    return value, output.getvalue(), error
+
+def read_script(path):
+    """Forms of the script at path, read while it runs so that failing to
+       open or parse it is reported like any other error"""
+    from src.parsers import parse_file
+    with io.open(path) as stream:
+        for expr in parse_file(stream):
+            yield expr
+
+def run_script(path, limits=None):
+    """Run the script at path in its own environment"""
+    start = clock()
+    _, output, error = isolated(read_script(path), limits)
+    return Result(path, output, error, clock() - start)
+
+def run_batch(directory, jobs=None, limits=None, out=sys.stdout, err=sys.stderr):
+    """Run every script under directory with 'jobs' workers (default: one
+       per core), each within the budget 'limits', print each script's
+       output under a header and a summary, and return the number of
+       scripts that failed"""
+    paths = scripts(directory)
+    jobs = jobs or multiprocessing.cpu_count()
+    failed, busy = 0, 0.0
+    start = clock()
+    pool = multiprocessing.Pool(jobs, initializer=worker_init)
+    try:
+        # Small scripts dominate, so hand them out in chunks
+        chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+        for result in pool.imap(partial(run_script, limits=limits), paths, chunksize):
+            busy += result.seconds
+            out.write('==> {} <==\n'.format(result.path))
+            out.write(result.output)
+            if result.error is not None:
+                failed += 1
+                err.write('{}: {}\n'.format(result.path, result.error))
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    elapsed = clock() - start
+
+    err.write('{} scripts, {} failed, {} workers: {:.2f}s wall, {:.2f}s in '
+              'scripts, {:.1f} scripts/s\n'.format(
+                  len(paths), failed, jobs, elapsed, busy,
+                  len(paths) / elapsed if elapsed else 0.0))
+    return failed
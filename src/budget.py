@@ -0,0 +1,121 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Limits on evaluation. A Budget watches closure applications the way the
+profiler does (see 'monitor' in eval.py) and stops the evaluation with
+BudgetExceeded once it has taken too many steps, run for too long, or
+nested non-tail calls too deeply. Every lisp loop is a closure application,
+and the list and stream builtins that loop in Python count a step for every
+thousand or so elements they handle (see 'tick' in operators.py), so
+neither can run for long unnoticed. A single builtin call that does its
+work in C, such as a bulk vector operation, is only stopped once it returns.
+
+    with Budget(steps=10**6, seconds=2.0) as budget:
+        eval(expr, env)
+
+Another thread can stop the evaluation early with budget.cancel(). Budgets
+watch every evaluation in the process while they are active.
+"""
+
+__all__ = ['Budget', 'BudgetExceeded', 'limited']
+
+import time
+
+clock = getattr(time, 'perf_counter', time.time)
+
+# Steps between looks at the clock
+CLOCK_INTERVAL = 256
+
+class BudgetExceeded(Exception):
+    """Evaluation ran out of budget. 'limit' is 'steps', 'seconds',
+       'depth' or 'cancelled'."""
+
+    def __init__(self, limit, message):
+        Exception.__init__(self, message)
+        self.limit = limit
+
+class Budget(object):
+    """Monitor counting steps (closure applications, tail calls and ticks of
+       builtin loops), time and depth of non-tail calls. A limit of None is
+       no limit."""
+
+    def __init__(self, steps=None, seconds=None, depth=None):
+        self.steps = steps
+        self.seconds = seconds
+        self.depth = depth
+        self.taken = 0
+        self.level = 0
+        self.deadline = None
+        self.cancelled = False
+
+    def __enter__(self):
+        from src.eval import monitor
+        if self.seconds is not None:
+            self.deadline = clock() + self.seconds
+        monitor(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        from src.eval import unmonitor
+        unmonitor(self)
+        return False
+
+    def cancel(self):
+        """Stop the evaluation at its next step. Safe to call from any
+           thread."""
+        self.cancelled = True
+
+    def step(self):
+        self.taken = taken = self.taken + 1
+        if self.cancelled:
+            raise BudgetExceeded('cancelled', 'Evaluation cancelled')
+        if self.steps is not None and taken > self.steps:
+            raise BudgetExceeded('steps',
+                'Exceeded budget of {} steps'.format(self.steps))
+        if self.deadline is not None and not taken % CLOCK_INTERVAL:
+            self.check_clock()
+
+    def check_clock(self):
+        if clock() > self.deadline:
+            raise BudgetExceeded('seconds',
+                'Exceeded budget of {} seconds'.format(self.seconds))
+
+    def call(self, function):
+        self.step()
+        if self.depth is not None and self.level >= self.depth:
+            raise BudgetExceeded('depth',
+                'Exceeded budget of {} nested calls'.format(self.depth))
+        self.level += 1
+
+    def bounce(self, function):
+        self.step()
+
+    def leave(self):
+        self.level -= 1
+
+    def tick(self):
+        """A builtin loop handled another TICK_INTERVAL elements. Each tick
+           is already a lot of work, so the clock is read every time."""
+        self.step()
+        if self.deadline is not None:
+            self.check_clock()
+
+class Unlimited(object):
+    """Stands in for a Budget when no limit is set, so nothing is paid for
+       monitoring"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def cancel(self):
+        pass
+
+def limited(steps=None, seconds=None, depth=None):
+    """Budget with the given limits, or an Unlimited one if there are none"""
+    if steps is None and seconds is None and depth is None:
+        return Unlimited()
+    return Budget(steps, seconds, depth)
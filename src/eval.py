@@ -4,15 +4,28 @@ from __future__ import print_function, unicode_literals
 """
 Evaluates lisp expressions. 'repl' reads from stdin. The other stuff probably
 shouldn't be called unless you know what you're doing.
+
+Expressions are evaluated in two steps. 'analyze' walks the s-expression once
+and compiles it into a tree of Python closures (nodes) that each take an
+environment and return a value. 'eval' analyzes an expression and runs the
+resulting node. Closure bodies are analyzed once when the lambda is analyzed,
+so calling a closure never looks at the s-expression again.
 """
 
-__all__ = ['zeta', 'printError']
+__all__ = ['zeta', 'printError', 'apply']
 
 from src.parsers import parse, parse_file
 from src.primitives import *
 from src.operators import *
+from src.operators import monitors
+from src.image import read_forms
+from src.budget import limited
+
+import os
+import sys
 
-import functools
+# Each level of non-tail lisp recursion takes a few Python frames
+RECURSION_LIMIT = 4000
 
 class Context(object):
     """Map symbol name to form implementation"""
@@ -25,155 +38,537 @@ class Context(object):
         self.forms[Symbol(name)] = function
         return function
 
+    def register_as(self, name):
+        """Register form under a name that is not a Python identifier"""
+        def register(function):
+            self.forms[Symbol(name)] = function
+            return function
+        return register
+
     def get(self, name):
         """Get implementation by name"""
         return self.forms.get(name)
 
-# Module level jump table for form implementations
+# Module level jump table for form analyzers. Each analyzer takes the rest of
+# the form, the Scope (or top-level Environment) it appears in and a flag
+# saying whether the form is in tail position, and returns a node.
 context = Context()
 
+# Special form names the analyzer looks for inside other forms
+DEFINE, DEFINE_MEMO, BEGIN = Symbol('define'), Symbol('define-memo'), Symbol('begin')
+
+def analyze_sequence(exprs, scope, tail):
+    """Build a node evaluating each expression and returning the last one.
+       Only the last expression is in tail position."""
+    if not exprs:
+        return lambda env: NIL
+    nodes = tuple(analyze(expr, scope) for expr in exprs[:-1])
+    last = analyze(exprs[-1], scope, tail)
+    if not nodes:
+        return last
+    def sequence(env):
+        for node in nodes:
+            node(env)
+        return last(env)
+    return sequence
+
+def declare(exprs, scope):
+    """Give every name defined directly in a body a slot up front so that
+       the body's functions can refer to each other"""
+    for expr in exprs:
+        if isatom(expr) or isnil(expr):
+            continue
+        first = car(expr)
+        if (first == DEFINE or first == DEFINE_MEMO) and len(expr) > 1:
+            name = car(cdr(expr))
+            if not isatom(name):
+                name = car(name)
+            scope.add(name)
+            scope.defines.add(name)
+        elif first == BEGIN:
+            declare(cdr(expr), scope)
+
+def analyze_closure(formals, body, scope, name=None):
+    """Analyze a closure body in a new scope. Return the body node, the
+       padding for the local slots the body defines and the closure's name"""
+    local = Scope(formals, scope, 'lambda' if name is None else str(name))
+    declare(body, local)
+    node = analyze_sequence(body, local, True)
+    return node, (UNBOUND,) * (len(local.names) - len(formals)), closure_name(local)
+
+def closure_name(scope):
+    """Qualify the name of a closure's scope with the closures around it"""
+    names = []
+    while isinstance(scope, Scope):
+        if scope.name is not None:
+            names.append(scope.name)
+        scope = scope.parent
+    return '/'.join(reversed(names))
+
 @context.register
-def eval_let(body, env):
-    """Bind each name and evaluate the body"""
-    local_env = Environment(scope=env)
+def analyze_let(body, scope, tail):
+    """Bind each name and evaluate the body. Each expression sees the names
+       bound before it."""
+    local = Scope((), scope)
+    bindings = []
     for name, expr in car(body):
-        value = eval(expr, local_env)
-        local_env[name] = value
-    return eval(single(Symbol('BEGIN')) + cdr(body), local_env)
+        node = analyze(expr, local)
+        bindings.append((local.add(name), node))
+    bindings = tuple(bindings)
+    declare(cdr(body), local)
+    sequence = analyze_sequence(cdr(body), local, tail)
+    padding = (UNBOUND,) * len(local.names)
+    def let(env):
+        frame = [env]
+        frame.extend(padding)
+        for index, node in bindings:
+            frame[index] = node(frame)
+        return sequence(frame)
+    return let
 
 @context.register
-def eval_lambda(function, env):
+def analyze_lambda(function, scope, tail):
     """Build a closure"""
     formals = car(function)
-    if isatom(car(cdr(function))):
-        body = car(cdr(function))
-    else:
-        body = car(car(cdr(function)))
-    if body == Symbol('DEF-BEGIN'):
-        body = single(Symbol('BEGIN')) + cdr(car(cdr(function)))
-    else:
-        body = single(Symbol('BEGIN')) + cdr(function)
-    return Closure(body, formals, env)
+    body, locals, name = analyze_closure(formals, cdr(function), scope)
+    return lambda env: Closure(body, formals, env, locals, name)
 
 @context.register
-def eval_quote(ls, env):
+def analyze_quote(ls, scope, tail):
     """Return the quoted object unevaluated"""
-    return car(ls)
+    value = to_list(car(ls))
+    return lambda env: value
 
 @context.register
-def eval_begin(exprs, env):
-    """Evaluate a sequence of expressions and return the last one in
-       a Thunk to keep simplifying"""
-    for expr in exprs[:-1]:
-        eval(expr, env)
-    return Thunk(exprs[-1])
+def analyze_begin(exprs, scope, tail):
+    """Evaluate a sequence of expressions and return the last one"""
+    return analyze_sequence(exprs, scope, tail)
 
 @context.register
-def eval_if(exprs, env):
-    """Evaluate the first expression and return the second or third
-       in a Thunk to keep simplifying"""
+def analyze_if(exprs, scope, tail):
+    """Evaluate the first expression and then the second or third"""
     if len(exprs) != 3:
         raise Exception('Malformed if: "{}"'.format(exprs))
-    test, consequent, alternative = exprs
-    return Thunk(consequent if eval(test, env) else alternative)
+    test, consequent, alternative = (
+        analyze(exprs[0], scope),
+        analyze(exprs[1], scope, tail),
+        analyze(exprs[2], scope, tail),
+    )
+    def if_(env):
+        return consequent(env) if test(env) else alternative(env)
+    return if_
 
 @context.register
-def eval_cond(exprs, env):
+def analyze_cond(exprs, scope, tail):
     """Evaluate conditions until one evaluates to True. Then
-       return the body in a Thunk to keep simplifying"""
-    for cond, expr in exprs:
-        test = eval(cond, env)
-        if test:
-            return Thunk(expr)
-    return NIL
+       evaluate the body"""
+    clauses = tuple(
+        (analyze(cond, scope), analyze(expr, scope, tail)) for cond, expr in exprs
+    )
+    def cond(env):
+        for test, node in clauses:
+            if test(env):
+                return node(env)
+        return NIL
+    return cond
 
 @context.register
-def eval_or(exprs, env):
+def analyze_or(exprs, scope, tail):
     """Short circuit or"""
-    for expr in exprs:
-        if eval(expr, env):
-            return True
-    return False
+    nodes = tuple(analyze(expr, scope) for expr in exprs)
+    def or_(env):
+        for node in nodes:
+            if node(env):
+                return True
+        return False
+    return or_
 
 @context.register
-def eval_and(exprs, env):
+def analyze_and(exprs, scope, tail):
     """Short circuit and"""
-    for expr in exprs:
-        if not eval(expr, env):
-            return False
-    return True
+    nodes = tuple(analyze(expr, scope) for expr in exprs)
+    def and_(env):
+        for node in nodes:
+            if not node(env):
+                return False
+        return True
+    return and_
+
+@context.register
+def analyze_delay(exprs, scope, tail):
+    """Promise to evaluate the expression when forced"""
+    node = analyze(car(exprs), scope)
+    return lambda env: Promise(lambda: node(env))
+
+@context.register_as('cons-stream')
+def analyze_cons_stream(exprs, scope, tail):
+    """Stream with the value of the first expression as its head and a
+       promise of the second as its tail"""
+    if len(exprs) != 2:
+        raise Exception('Malformed cons-stream: "{}"'.format(exprs))
+    head, rest = analyze(exprs[0], scope), analyze(exprs[1], scope)
+    return lambda env: Pair(head(env), Promise(lambda: rest(env)))
 
 @context.register
-def eval_define(expr, env):
-    """Define a name or function in the current environment"""
+def analyze_define(expr, scope, tail):
+    """Define a name or function in the current scope"""
     if isatom(car(expr)):
         name = car(expr)
-        env[name] = eval(car(cdr(expr)), env)
-        return NIL
+        node = analyze(car(cdr(expr)), scope)
     else:
         name = car(car(expr))
         formals = cdr(car(expr))
-        body = single(Symbol('DEF-BEGIN')) + cdr(expr)
-        function = (Symbol('LAMBDA'), formals, body)
-        closure = eval(function, env)
-        env[name] = closure
-        return NIL
+        body, locals, qualified = analyze_closure(formals, cdr(expr), scope, name)
+        node = lambda env: Closure(body, formals, env, locals, qualified)
+    return definition(name, node, scope)
+
+@context.register_as('define-memo')
+def analyze_define_memo(expr, scope, tail):
+    """Define a function that caches its results. Its recursive calls go
+       through the cache too."""
+    if isatom(car(expr)):
+        raise Exception('Malformed define-memo: "{}"'.format(expr))
+    name = car(car(expr))
+    formals = cdr(car(expr))
+    body, locals, qualified = analyze_closure(formals, cdr(expr), scope, name)
+    node = lambda env: Memo(Closure(body, formals, env, locals, qualified))
+    return definition(name, node, scope)
+
+def definition(name, node, scope):
+    """Build a node binding name to the value of node in scope"""
+    if isinstance(scope, Scope):
+        index = scope.add(name)
+        def define(env):
+            env[index] = node(env)
+            return NIL
+    else:
+        cell = scope.cell(name)
+        def define(env):
+            cell.value = node(env)
+            return NIL
+    return define
 
 @context.register
-def eval_delete(expr, env):
+def analyze_delete(expr, scope, tail):
     """Remove a named object from the current environment"""
-    if isatom(car(expr)):
-        env.pop(car(expr))
-    return NIL
+    name = car(expr)
+    if not isatom(name):
+        return lambda env: NIL
+    address = scope.lookup(name)
+    if address is None:
+        root = toplevel(scope)
+        def delete(env):
+            root.pop(name)
+            return NIL
+    else:
+        depth, index, owner = address
+        owner.defines.add(name)
+        def delete(env):
+            for _ in range(depth):
+                env = env[0]
+            env[index] = UNBOUND
+            return NIL
+    return delete
 
 @context.register
-def eval_load(s, env):
-    """Evaluate sequence of expressions in current environment"""
-    with open(car(s)) as stream:
-        value = NIL
-        for expression in parse_file(stream):
-            value = eval(expression, env)
+def analyze_load(s, scope, tail):
+    """Evaluate sequence of expressions in the top-level environment"""
+    path, root = car(s), toplevel(scope)
+    return lambda env: load(path, root)
+
+def load(path, env):
+    """Evaluate each expression in the file at path and return the last value"""
+    value = NIL
+    for expression in read_forms(path):
+        value = eval(expression, env)
+    return value
+
+@context.register
+def analyze_eval(s, scope, tail):
+    """Evaluate the value of an expression as code in the top-level
+       environment it appears in"""
+    if len(s) != 1:
+        raise Exception('Malformed eval: "{}"'.format(s))
+    expr, root = analyze(car(s), scope, False), toplevel(scope)
+    return lambda env: eval(to_tuple(expr(env)), root)
+
+@context.register
+def analyze_require(s, scope, tail):
+    """Load a file into the top-level environment unless it already was"""
+    path, root = car(s), toplevel(scope)
+    return lambda env: require(path, root)
+
+def require(path, env, load=load):
+    """Load the file at path into env the first time it is required there.
+       Returns whether it was loaded now."""
+    resolved = os.path.realpath(path)
+    if resolved in env.required:
+        return False
+    # Added first, so files requiring each other stop
+    env.required.add(resolved)
+    try:
+        load(path, env)
+    except BaseException:
+        env.required.discard(resolved)
+        raise
+    return True
+
+def analyze_variable(name, scope):
+    """Look name up in its frame, or in its top-level cell if no enclosing
+       scope binds it"""
+    address = scope.lookup(name)
+    if address is None:
+        cell = toplevel(scope).cell(name)
+        def variable(env):
+            value = cell.value
+            if value is UNBOUND:
+                raise NameError("No binding for name '{}' in scope".format(name))
+            return value
+        return variable
+
+    depth, index, owner = address
+    if depth == 0:
+        get = lambda env: env[index]
+    elif depth == 1:
+        get = lambda env: env[0][index]
+    elif depth == 2:
+        get = lambda env: env[0][0][index]
+    else:
+        def get(env):
+            for _ in range(depth):
+                env = env[0]
+            return env[index]
+    if name not in owner.defines:
+        return get
+    def variable(env):
+        value = get(env)
+        if value is UNBOUND:
+            raise NameError("No binding for name '{}' in scope".format(name))
         return value
+    return variable
 
-def eval(expr, env):
-    """Evaluate s-expression parsed into tuples"""
+# Applications are specialized on the number of arguments. A closure's
+# arguments are evaluated straight into its new frame; a builtin gets them as
+# positional arguments. In tail position a closure is not run but returned in
+# a Thunk for the enclosing 'run' to keep simplifying.
+
+def reject(function, count):
+    """Explain why calling builtin function with count arguments raised
+       TypeError, or return to let the original error through"""
+    if not hasattr(function, '__call__'):
+        raise Exception("Cannot apply '{}'".format(function))
+    arity = getattr(function, 'arity', None)
+    if arity is not None and arity != count:
+        error, message = function.arity_error
+        raise error(message)
+
+def wrong_arity():
+    raise Exception("Wrong number of actual parameters")
+
+def application0(operator, operands, tail):
+    def application(env):
+        function = operator(env)
+        if type(function) is Closure:
+            frame = [function.env]
+            if function.arity != 0:
+                wrong_arity()
+            if function.locals:
+                frame.extend(function.locals)
+            return Thunk(function, frame) if tail else run(function, frame)
+        try:
+            return function()
+        except TypeError:
+            reject(function, 0)
+            raise
+    return application
+
+def application1(operator, operands, tail):
+    a, = operands
+    def application(env):
+        function = operator(env)
+        if type(function) is Closure:
+            frame = [function.env, a(env)]
+            if function.arity != 1:
+                wrong_arity()
+            if function.locals:
+                frame.extend(function.locals)
+            return Thunk(function, frame) if tail else run(function, frame)
+        x = a(env)
+        try:
+            return function(x)
+        except TypeError:
+            reject(function, 1)
+            raise
+    return application
+
+def application2(operator, operands, tail):
+    a, b = operands
+    def application(env):
+        function = operator(env)
+        if type(function) is Closure:
+            frame = [function.env, a(env), b(env)]
+            if function.arity != 2:
+                wrong_arity()
+            if function.locals:
+                frame.extend(function.locals)
+            return Thunk(function, frame) if tail else run(function, frame)
+        x, y = a(env), b(env)
+        try:
+            return function(x, y)
+        except TypeError:
+            reject(function, 2)
+            raise
+    return application
+
+def application3(operator, operands, tail):
+    a, b, c = operands
+    def application(env):
+        function = operator(env)
+        if type(function) is Closure:
+            frame = [function.env, a(env), b(env), c(env)]
+            if function.arity != 3:
+                wrong_arity()
+            if function.locals:
+                frame.extend(function.locals)
+            return Thunk(function, frame) if tail else run(function, frame)
+        x, y, z = a(env), b(env), c(env)
+        try:
+            return function(x, y, z)
+        except TypeError:
+            reject(function, 3)
+            raise
+    return application
+
+def applicationN(operator, operands, tail):
+    count = len(operands)
+    def application(env):
+        function = operator(env)
+        if type(function) is Closure:
+            frame = [function.env]
+            for node in operands:
+                frame.append(node(env))
+            if function.arity != count:
+                wrong_arity()
+            if function.locals:
+                frame.extend(function.locals)
+            return Thunk(function, frame) if tail else run(function, frame)
+        actuals = [node(env) for node in operands]
+        try:
+            return function(*actuals)
+        except TypeError:
+            reject(function, count)
+            raise
+    return application
+
+APPLICATIONS = (application0, application1, application2, application3)
+
+def analyze_application(expr, scope, tail):
+    """Evaluate the function and its arguments, then apply"""
+    operator = analyze(car(expr), scope)
+    operands = tuple(analyze(x, scope) for x in cdr(expr))
+    if len(operands) < len(APPLICATIONS):
+        return APPLICATIONS[len(operands)](operator, operands, tail)
+    return applicationN(operator, operands, tail)
+
+def analyze(expr, scope, tail=False):
+    """Compile s-expression parsed into tuples into a node. Names are
+       resolved against scope, which is a Scope or a top-level Environment."""
+    if isinstance(expr, Symbol):
+        return analyze_variable(expr, scope)
+    elif isnil(expr) or not isinstance(expr, tuple):
+        return lambda env: expr
+
+    first, rest = splits(expr)
+    form = context.get(first)
+    if form is not None:
+        return form(rest, scope, tail)
+    return analyze_application(expr, scope, tail)
+
+def fast_run(function, frame):
+    """Run the body of closure function in its new frame. Tail calls made
+       by the body come back as Thunks and are run here in constant stack
+       space."""
     while 1:
-        if isinstance(expr, Symbol):
-            return env[expr]
-        elif isnil(expr) or not isinstance(expr, tuple):
-            return expr
-
-        first, rest = splits(expr)
-        form = context.get(first)
-        if form is not None:
-            expr = form(rest, env)
-            if isinstance(expr, Thunk):
-                expr = expr.value
-            else:
-                return expr
-        else:
-            exprs = tuple(eval(expr, env) for expr in expr)
-            function, actuals = splits(exprs)
-            if isinstance(function, Closure):
-                if len(function.formals) != len(actuals):
-                    raise Exception("Wrong number of actual parameters")
-                env = Environment(function.env, **dict(zip(function.formals, actuals)))
-                expr = function.body
-            elif hasattr(function, '__call__'):
-                return function(actuals)
-            else:
-                raise Exception("Cannot apply '{}'".format(function))
+        value = function.body(frame)
+        if type(value) is not Thunk:
+            return value
+        function, frame = value.function, value.frame
+
+def apply(function, actuals):
+    """Apply function to a sequence of actuals. Builtins written in Python
+       call this to apply closures; it is re-entrant, so those closures can
+       call builtins that call apply."""
+    if type(function) is Closure:
+        if function.arity != len(actuals):
+            wrong_arity()
+        frame = [function.env]
+        frame.extend(actuals)
+        if function.locals:
+            frame.extend(function.locals)
+        return run(function, frame)
+    try:
+        return function(*actuals)
+    except TypeError:
+        reject(function, len(actuals))
+        raise
+
+# Monitors watch closure applications, see 'monitor'. While there are none,
+# 'run' is 'fast_run' and nothing is paid for them. The list of monitors
+# lives in operators.py, whose native loops tick them.
+run = fast_run
+
+def monitored_run(function, frame):
+    """Same as 'fast_run', but tell each monitor when a closure is called,
+       when the trampoline bounces into another closure and when the call
+       returns"""
+    watching, called = tuple(monitors), 0
+    try:
+        # A monitor may refuse the call; only those told about it are told
+        # when it ends
+        for watcher in watching:
+            watcher.call(function)
+            called += 1
+        while 1:
+            value = function.body(frame)
+            if type(value) is not Thunk:
+                return value
+            function, frame = value.function, value.frame
+            for watcher in watching:
+                watcher.bounce(function)
+    finally:
+        for watcher in watching[:called]:
+            watcher.leave()
+
+def monitor(watcher):
+    """Report closure applications to watcher, an object with 'call',
+       'bounce' and 'leave' methods, and builtin loops to its 'tick' method"""
+    global run
+    monitors.append(watcher)
+    run = monitored_run
+
+def unmonitor(watcher):
+    """Stop reporting to watcher"""
+    global run
+    monitors.remove(watcher)
+    if not monitors:
+        run = fast_run
+
+def eval(expr, env):
+    """Evaluate s-expression parsed into tuples in top-level environment env"""
+    return analyze(expr, env)(env)
 
 def printError(e):
     """Print exception with name and reason"""
     print('{}: {}\n'.format(e.__class__.__name__, str_list(e)))
 
-def repl(env):
+def repl(env, limits=None, evaluate=eval):
     print("Type (help) for global definitions")
     while 1:
         value = NIL
         try:
-            value = eval(parse('[]> '), env)
+            expr = parse('[]> ')
+            with limited(**(limits or {})):
+                value = evaluate(expr, env)
             print('Value: {}\n'.format(str_list(value)))
         except EOFError:
             break
@@ -182,17 +577,38 @@ def repl(env):
         except Exception as e:
             printError(e)
 
-def zeta(stream):
-    eval_load(single('src/library.lisp'), global_env)
+def select_engine(name):
+    """The eval and load functions of an engine: 'eval' for this module,
+       'vm' for the bytecode engine"""
+    if name == 'vm':
+        from src import vm
+        return vm.eval, vm.load
+    return eval, load
+
+def boot(engine='eval'):
+    """Prepare the interpreter and load the library into global_env"""
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), RECURSION_LIMIT))
+    select_engine(engine)[1]('src/library.lisp', global_env)
+
+def zeta(stream, limits=None, optimized=False, engine='eval'):
+    """Run the program in stream, or a repl if it is a terminal, with the
+       named engine. 'limits' are the keyword arguments of budget.limited;
+       a script gets one budget, every expression typed at the repl gets its
+       own. An 'optimized' script goes through the optimizer first."""
+    boot(engine)
+    eval = select_engine(engine)[0]
     if stream.isatty():
-        repl(global_env)
+        repl(global_env, limits, eval)
     else:
-        for expr in parse_file(stream):
-            try:
-                eval(expr, global_env)
-            except (KeyboardInterrupt, EOFError):
-                break
-            except Exception as e:
-                printError(e)
-                break
-
+        try:
+            forms = parse_file(stream)
+            if optimized:
+                from src.optimizer import optimize
+                forms = optimize(forms)
+            with limited(**(limits or {})):
+                for expr in forms:
+                    eval(expr, global_env)
+        except (KeyboardInterrupt, EOFError):
+            pass
+        except Exception as e:
+            printError(e)
@@ -0,0 +1,99 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Caches of parsed files, used by load and require. Every file read is kept in
+memory for the rest of the process, keyed by its resolved path. The first
+time a library file is loaded its parsed forms are also pickled next to it
+in '<file>.image', and later runs read the image instead of parsing the
+source again; with 'use_cache_directory' other files get images in that
+directory. Cached forms remember the size and modification time of the
+source they were built from and are read again whenever either changes.
+"""
+
+__all__ = ['read_forms', 'use_cache_directory']
+
+import hashlib
+import os
+import pickle
+
+from src.parsers import parse_file
+
+# Bump when the representation of parsed forms changes
+IMAGE_VERSION = 2
+
+# Only files in the library directory get images
+LIBRARY = os.path.dirname(os.path.realpath(__file__))
+
+# Directory for images of files outside the library, if any
+cache_directory = None
+
+# Resolved path to (source key, forms) of every file read in this process
+parsed = {}
+
+def use_cache_directory(directory):
+    """Keep images of every file loaded from now on in directory"""
+    global cache_directory
+    if directory is not None and not os.path.isdir(directory):
+        os.makedirs(directory)
+    cache_directory = directory
+
+def image_path(path):
+    """Where the image of the file at resolved path is kept, or None"""
+    if os.path.dirname(path) == LIBRARY:
+        return path + '.image'
+    elif cache_directory is not None:
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()
+        return os.path.join(cache_directory, '{}-{}.image'.format(
+            os.path.basename(path), digest[:16]))
+    return None
+
+def source_key(path):
+    """Identify the version of the source an image was built from"""
+    stat = os.stat(path)
+    return IMAGE_VERSION, stat.st_mtime, stat.st_size
+
+def load_image(image, key):
+    """Get forms from an image, or None if it is missing or stale"""
+    try:
+        with open(image, 'rb') as stream:
+            image_key, forms = pickle.load(stream)
+    except Exception:
+        return None
+    return forms if image_key == key else None
+
+def save_image(image, key, forms):
+    """Write an image. Failing to write it only costs speed."""
+    temporary = '{}.{}'.format(image, os.getpid())
+    try:
+        with open(temporary, 'wb') as stream:
+            pickle.dump((key, forms), stream, pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary, image)
+    except (IOError, OSError):
+        pass
+
+def read_forms(path):
+    """Get the parsed forms in the file at path, from a cache when one is up
+       to date. Forms are handed out as they are parsed, so the ones before
+       a syntax error still run."""
+    resolved = os.path.realpath(path)
+    key = source_key(path)
+    cached = parsed.get(resolved)
+    if cached is not None and cached[0] == key:
+        forms = cached[1]
+    else:
+        image = image_path(resolved)
+        forms = None if image is None else load_image(image, key)
+        if forms is None:
+            forms = []
+            with open(path) as stream:
+                for form in parse_file(stream):
+                    forms.append(form)
+                    yield form
+            parsed[resolved] = key, forms
+            if image is not None:
+                save_image(image, key, forms)
+            return
+        parsed[resolved] = key, forms
+    for form in forms:
+        yield form
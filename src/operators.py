@@ -7,32 +7,59 @@ All "builtin" functions and operators are defined here.
 
 import math
 import operator
-from functools import wraps
+from array import array
+from collections import OrderedDict
+from fractions import Fraction
+from functools import reduce, wraps
 from src.primitives import *
+from src.ports import *
 
 __all__ = [
-    'global_env', 'UserError'
+    'global_env', 'UserError', 'Memo'
 ]
 
-def native(function):
-    """Turn a lisp list into an args tuple for native python functions"""
-    @wraps(function)
-    def decorated(ls):
-        return function(*ls)
-    return decorated
+# Builtins are plain Python functions called with positional arguments. The
+# evaluator uses 'arity' and 'arity_error' on a builtin, when present, to
+# report a call with the wrong number of arguments.
+
+def counted(function, count):
+    """Reject the wrong number of arguments with the TypeError the list
+       primitives have always raised"""
+    function.arity = count
+    function.arity_error = TypeError, "Wrong number of positional arguments"
+    return function
+
+def procedure(function, count):
+    """Reject the wrong number of arguments the way closure application
+       does"""
+    function.arity = count
+    function.arity_error = Exception, "Wrong number of actual parameters"
+    return function
+
+# Marks an operand that was not given
+MISSING = object()
+
+def whole(x):
+    """Rationals that are whole numbers are integers"""
+    if type(x) is Fraction and x.denominator == 1:
+        return x.numerator
+    return x
 
 def variadic_op(binary_op):
-    """Turn a binary operator into a variadic operator using a left fold"""
+    """Turn a binary operator into a variadic operator using a left fold.
+       The usual one and two operand calls take no detour through a loop."""
     @wraps(binary_op)
-    def new_op(ls):
-        if isnil(ls):
+    def new_op(x=MISSING, y=MISSING, *more):
+        if more:
+            return whole(reduce(binary_op, more, binary_op(x, y)))
+        elif y is not MISSING:
+            value = binary_op(x, y)
+            if type(value) is Fraction and value.denominator == 1:
+                return value.numerator
+            return value
+        elif x is MISSING:
             raise ValueError("{} takes at least 1 operand".format(binary_op))
-        else:
-            out, ls = splits(ls)
-            while not isnil(ls):
-                out = binary_op(out, car(ls))
-                ls = cdr(ls)
-            return out
+        return x
     return new_op
 
 class UserError(Exception):
@@ -43,21 +70,481 @@ def error(msg):
     """Can't raise in a lambda"""
     raise UserError(msg)
 
-def display(ls):
+def rational(n, d):
+    """Build an exact rational number n/d in lowest terms"""
+    if d == 0:
+        error("Denominator cannot be zero")
+    return whole(Fraction(n, d))
+
+def exact(x):
+    """Check a builtin argument is an integer or a rational"""
+    if not isinstance(x, (int, Fraction)) or isinstance(x, bool):
+        raise TypeError("Wrong argument type")
+    return x
+
+def display(*ls):
     print(str_list(ls)[1:-1])
     return NIL
 
 def read():
-    """Read input from stdin"""
+    """Read an expression from the terminal, or the next datum of stdin"""
     import sys
-    from src.parsers.file_parser import parse_file
-    from src.parsers.interactive_parser import parse
-    return parse() if sys.stdin.isatty() else parse_file(sys.stdin)
+    from src.parsers import parse
+    if sys.stdin.isatty():
+        return to_list(parse())
+    return read_datum()
 
 def _eval(expr):
-    """Evaluate an expression in the global environment"""
+    """Evaluate an expression in the global environment. Calls written as
+       (eval x) are a special form using the caller's environment; this is
+       only reached when eval is passed around as a value. Scripts run by
+       --batch or --serve bind their own EVAL instead, see batch.isolated."""
     from src.eval import eval
-    return eval(expr, global_env)
+    return eval(to_tuple(expr), global_env)
+
+# Monitors watching evaluation, see 'monitor' in eval.py. Native loops apply
+# no closures, so while there are monitors they tick them every
+# TICK_INTERVAL elements instead; a budget can then stop a loop over a range
+# of millions that runs entirely in Python.
+monitors = []
+TICK_INTERVAL = 1024
+
+def tick():
+    """Tell the monitors a builtin has handled another TICK_INTERVAL
+       elements, and return the count to the next tick"""
+    for watcher in tuple(monitors):
+        watcher.tick()
+    return TICK_INTERVAL
+
+# Native versions of the list functions in lists.lisp. Each one follows the
+# lisp definition step for step, so they fail in the same places with the
+# same errors.
+
+def walk(ls):
+    """Iterate over the elements of a list"""
+    if not isinstance(ls, (Pair, tuple)):
+        raise TypeError("Wrong argument type")
+    return ticking(ls) if monitors else iter(ls)
+
+def ticking(ls):
+    ticks = TICK_INTERVAL
+    for item in ls:
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+        yield item
+
+def build(items):
+    """Build a list from a Python sequence"""
+    out = NIL
+    for item in reversed(items):
+        out = Pair(item, out)
+    return out
+
+def reverse(ls):
+    out = NIL
+    for item in walk(ls):
+        out = Pair(item, out)
+    return out
+
+def range_(start, stop):
+    out, x, ticks = NIL, stop, TICK_INTERVAL
+    while not x < start:
+        out = Pair(x, out)
+        x = x - 1
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    return out
+
+def map_(f, ls):
+    from src.eval import apply
+    return build([apply(f, (x,)) for x in walk(ls)])
+
+def filter_(pred, ls):
+    from src.eval import apply
+    return build([x for x in walk(ls) if apply(pred, (x,))])
+
+def foldl(f, init, ls):
+    from src.eval import apply
+    acc = init
+    for x in walk(ls):
+        acc = apply(f, (acc, x))
+    return acc
+
+class Stepped(object):
+    """Builtin taking a function first that an engine keeping its own stack
+       of calls, such as the vm, can run one call at a time. 'steps' takes
+       the same arguments and is a generator yielding the function and the
+       arguments of each call it needs, being sent the value, and returning
+       the value of the builtin. Python code calls the builtin itself."""
+
+    def __init__(self, function, steps):
+        self.function = function
+        self.steps = steps
+
+    def __call__(self, *args):
+        return self.function(*args)
+
+def map_steps(f, ls):
+    out = []
+    for x in walk(ls):
+        out.append((yield f, (x,)))
+    return build(out)
+
+def filter_steps(pred, ls):
+    out = []
+    for x in walk(ls):
+        if (yield pred, (x,)):
+            out.append(x)
+    return build(out)
+
+def foldl_steps(f, init, ls):
+    acc = init
+    for x in walk(ls):
+        acc = yield f, (acc, x)
+    return acc
+
+def zip_(l1, l2):
+    out, ticks = [], TICK_INTERVAL
+    while not (isnil(l1) or isnil(l2)):
+        out.append(Pair(car(l1), Pair(car(l2), NIL)))
+        l1, l2 = cdr(l1), cdr(l2)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    return build(out)
+
+def length(ls):
+    count = 0
+    for _ in walk(ls):
+        count += 1
+    return count
+
+def drop(n, ls):
+    ticks = TICK_INTERVAL
+    while not (isnil(ls) or n == 0):
+        n, ls = n - 1, cdr(ls)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    return ls
+
+def take(n, ls):
+    out, count, ticks = [], 0, TICK_INTERVAL
+    while not (isnil(ls) or count == n):
+        out.append(car(ls))
+        count, ls = count + 1, cdr(ls)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    return build(out)
+
+def list_ref(n, ls):
+    ticks = TICK_INTERVAL
+    while 1:
+        if isnil(ls):
+            error("Accessed beyond end of list")
+        elif n == 1:
+            return car(ls)
+        n, ls = n - 1, cdr(ls)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+
+def sum_(ls):
+    acc = 0
+    for x in walk(ls):
+        acc = acc + x
+    return acc
+
+def product(ls):
+    acc = 1
+    for x in walk(ls):
+        acc = acc * x
+    return acc
+
+def max_(ls):
+    out = car(ls)
+    for y in walk(cdr(ls)):
+        out = out if out > y else y
+    return out
+
+def min_(ls):
+    out = car(ls)
+    for y in walk(cdr(ls)):
+        out = out if out < y else y
+    return out
+
+# Streams are lists whose tail is a promise of the rest, as made by
+# cons-stream. The stream functions below build theirs from transient
+# promises, so walking a stream of millions of elements only ever keeps the
+# current one alive, even while something still refers to its head.
+
+def stream_car(s):
+    return car(s)
+
+def stream_null(s):
+    return isnil(s)
+
+def stream_cdr(s):
+    """Force the rest of a stream"""
+    return force(cdr(s))
+
+def stream_range(start, stop):
+    if start > stop:
+        return NIL
+    return Pair(start, Promise(lambda: stream_range(start + 1, stop), True))
+
+# Tails made here are transient promises, see Promise: walking a stream twice
+# calls f or pred again for every element after the first
+
+def stream_map(f, s):
+    from src.eval import apply
+    if isnil(s):
+        return NIL
+    return Pair(apply(f, (car(s),)),
+                Promise(lambda: stream_map(f, stream_cdr(s)), True))
+
+def stream_filter(pred, s):
+    from src.eval import apply
+    ticks = TICK_INTERVAL
+    while not isnil(s) and not apply(pred, (car(s),)):
+        s = stream_cdr(s)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    if isnil(s):
+        return NIL
+    return Pair(car(s), Promise(lambda: stream_filter(pred, stream_cdr(s)), True))
+
+def stream_take(n, s):
+    if n == 0 or isnil(s):
+        return NIL
+    return Pair(car(s), Promise(lambda: stream_take(n - 1, stream_cdr(s)), True))
+
+def stream_foldl(f, init, s):
+    from src.eval import apply
+    acc, ticks = init, TICK_INTERVAL
+    while not isnil(s):
+        acc = apply(f, (acc, car(s)))
+        s = stream_cdr(s)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    return acc
+
+def stream_to_list(s):
+    out, ticks = [], TICK_INTERVAL
+    while not isnil(s):
+        out.append(car(s))
+        s = stream_cdr(s)
+        ticks -= 1
+        if not ticks:
+            ticks = tick()
+    return build(out)
+
+# Results a memoized function keeps unless told otherwise
+MEMO_SIZE = 1024
+
+def typed_key(x):
+    """Hashable key for x telling apart values Python finds equal, such as
+       1, 1.0 and #t, or the symbol ABC and the string "ABC". Lists are
+       keyed by their items, and chains of pairs not ending in nil by their
+       tail as well, so streams differ by the promise of their rest."""
+    if isinstance(x, (Pair, tuple)):
+        items = []
+        while isinstance(x, Pair):
+            items.append(typed_key(x.car))
+            x = x.cdr
+        if not isinstance(x, tuple):
+            return tuple, tuple(items), typed_key(x)
+        items.extend(typed_key(item) for item in x)
+        return tuple, tuple(items)
+    return type(x), x
+
+class Memo(object):
+    """Function whose results are cached by argument, dropping the least
+       recently used once 'size' are kept. Calls with arguments that cannot
+       be hashed go straight through."""
+
+    def __init__(self, function, size=MEMO_SIZE):
+        if not hasattr(function, '__call__') and not isinstance(function, Closure):
+            raise TypeError("Wrong argument type")
+        if size < 1:
+            error("Memo size must be positive")
+        self.function = function
+        self.size = size
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+        if isinstance(function, Closure):
+            procedure(self, function.arity)
+        elif hasattr(function, 'arity'):
+            self.arity, self.arity_error = function.arity, function.arity_error
+
+    def __repr__(self):
+        return '<MEMO>'
+
+    def __call__(self, *args):
+        cache = self.cache
+        key = tuple(typed_key(arg) for arg in args)
+        try:
+            value = cache.pop(key)
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable arguments
+            self.misses += 1
+            return self.apply(args)
+        else:
+            self.hits += 1
+            cache[key] = value
+            return value
+        self.misses += 1
+        value = self.apply(args)
+        cache[key] = value
+        if len(cache) > self.size:
+            cache.popitem(last=False)
+        return value
+
+    def apply(self, args):
+        from src.eval import apply
+        return apply(self.function, args)
+
+    def stats(self):
+        """List of hits, misses and cached results"""
+        return build([self.hits, self.misses, len(self.cache)])
+
+    def clear(self):
+        """Forget cached results and statistics"""
+        self.cache.clear()
+        self.hits = self.misses = 0
+        return NIL
+
+def memoize(function, size=MEMO_SIZE):
+    return Memo(function, size)
+
+def memo(function):
+    """Check a builtin argument is a memoized function"""
+    if not isinstance(function, Memo):
+        error("Not a memoized function")
+    return function
+
+# Numeric vectors are arrays of doubles: eight bytes an element, and the bulk
+# operations on them loop in C
+
+def f64vector(*xs):
+    return to_f64vector(xs)
+
+def to_f64vector(items):
+    try:
+        return array('d', items)
+    except TypeError:
+        raise TypeError("Wrong argument type")
+
+def numeric(v):
+    """Check a builtin argument is a numeric vector. Vectors of numbers
+       work too, just more slowly."""
+    if not isinstance(v, (array, list)):
+        raise TypeError("Wrong argument type")
+    return v
+
+def check_index(v, i):
+    """Check i is a valid index into vector v"""
+    if not 0 <= i < len(v):
+        error("Index {} out of range".format(i))
+
+def f64vector_ref(v, i):
+    check_index(numeric(v), i)
+    return v[i]
+
+def vector_sum(v):
+    return sum(numeric(v), 0.0)
+
+def vector_dot(a, b):
+    if len(numeric(a)) != len(numeric(b)):
+        error("Vectors differ in length")
+    return sum(map(operator.mul, a, b), 0.0)
+
+# Vectors are Python lists and tables are dicts, both mutable in place
+
+def vector(v):
+    """Check a builtin argument is a vector"""
+    if type(v) is not list:
+        raise TypeError("Wrong argument type")
+    return v
+
+def make_vector(n, fill=NIL):
+    if not isinstance(n, int) or n < 0:
+        error("Vector length must be a natural number")
+    return [fill] * n
+
+def vector_ref(v, i):
+    check_index(vector(v), i)
+    return v[i]
+
+def vector_set(v, i, x):
+    check_index(vector(v), i)
+    v[i] = x
+    return NIL
+
+def table(t):
+    """Check a builtin argument is a table"""
+    if type(t) is not dict:
+        raise TypeError("Wrong argument type")
+    return t
+
+# Tables map the typed_key of each key to the pair of the key and its value,
+# so that keys of different types stay apart. A key that cannot be hashed is
+# never in a table.
+
+def table_ref(t, key, default=NIL):
+    table(t)
+    try:
+        entry = t.get(typed_key(key))
+    except TypeError:
+        return default
+    return default if entry is None else entry[1]
+
+def table_set(t, key, value):
+    table(t)
+    try:
+        t[typed_key(key)] = key, value
+    except TypeError:
+        error("Cannot use {} as a key".format(str_list(key)))
+    return NIL
+
+def table_delete(t, key):
+    table(t)
+    try:
+        t.pop(typed_key(key), None)
+    except TypeError:
+        pass
+    return NIL
+
+def table_contains(t, key):
+    table(t)
+    try:
+        return typed_key(key) in t
+    except TypeError:
+        return False
+
+def disassemble(x):
+    """Print the bytecode of a closure compiled for the vm, or of a quoted
+       expression"""
+    from src import vm
+    if isinstance(x, vm.Procedure):
+        vm.disassemble(x.code)
+    elif isinstance(x, Closure):
+        error("Closure was not compiled for the vm")
+    else:
+        vm.disassemble(vm.compile(to_tuple(x), global_env))
+    return NIL
+
+def _profiler():
+    """Import the profiler when a profiling builtin is first used"""
+    from src import profiler
+    return profiler
 
 def help():
     print("Defined:")
@@ -67,10 +554,13 @@ def help():
 
 # Builtin functions
 global_env = Environment(**{
-    Symbol(key): native(value) for key, value in {
+    Symbol(key): value for key, value in {
         # Nullary operator
         'HELP': help,
         'READ': read,
+        'PROFILE-START': lambda: _profiler().start(),
+        'PROFILE-STOP': lambda: _profiler().stop(),
+        'PROFILE-REPORT': lambda: _profiler().report(),
 
         # Unary operators
         '++': lambda x: x + 1,
@@ -81,18 +571,25 @@ global_env = Environment(**{
         'COS': math.cos,
         'TAN': math.tan,
         'NOT': operator.not_,
-        'CAR': car,
-        'CDR': cdr,
         'ATOM?': isatom,
         'NULL?': isnil,
         'INTEGER?': lambda x: isinstance(x, int),
-        'REAL?': lambda x: isinstance(x, (int, float)),
-        'NUMBER?': lambda x: isinstance(x, (int, float)),
+        'RATIONAL?': lambda x: isinstance(x, (int, Fraction)),
+        'REAL?': lambda x: isinstance(x, (int, float, Fraction)),
+        'NUMBER?': lambda x: isinstance(x, (int, float, Fraction)),
+        'NUMERATOR': lambda x: exact(x).numerator,
+        'DENOMINATOR': lambda x: exact(x).denominator,
         'STRING?': lambda x: isinstance(x, str) and not isinstance(x, Symbol),
         'SYMBOL?': lambda x: isinstance(x, Symbol),
         'LIST?': lambda x: isnil(x) or not isatom(x),
         'ERROR': error,
+        'PROFILE-SAVE': lambda path: _profiler().save(path),
+        'FORCE': force,
+        'PROMISE?': lambda x: isinstance(x, Promise),
+        'MEMO-STATS': lambda f: memo(f).stats(),
+        'MEMO-CLEAR': lambda f: memo(f).clear(),
         'EVAL': _eval,
+        'DISASSEMBLE': disassemble,
 
         # Binary Operators
         '<': operator.lt,
@@ -101,13 +598,109 @@ global_env = Environment(**{
         '<=': operator.le,
         '>=': operator.ge,
         '/=': operator.ne,
-        'MOD': operator.mod,
-        'APPEND': append,
-        'CONS': cons,
+        'MOD': lambda x, y: whole(x % y),
+        'RATIONAL': rational,
         'EQ?': lambda x, y: x is y,
     }.items()
 })
 
+# Numeric vectors
+global_env.update(**{
+    Symbol(key): procedure(value, count) for key, value, count in (
+        ('LIST->F64VECTOR', lambda ls: to_f64vector(walk(ls)), 1),
+        ('F64VECTOR->LIST', lambda v: build(numeric(v)), 1),
+        ('F64VECTOR-LENGTH', lambda v: len(numeric(v)), 1),
+        ('F64VECTOR-REF', f64vector_ref, 2),
+        ('F64VECTOR?', lambda x: isinstance(x, array), 1),
+        ('VECTOR-SUM', vector_sum, 1),
+        ('VECTOR-DOT', vector_dot, 2),
+    )
+})
+global_env[Symbol('F64VECTOR')] = f64vector
+
+# Vectors and tables
+global_env.update(**{
+    Symbol(key): procedure(value, count) for key, value, count in (
+        ('VECTOR-REF', vector_ref, 2),
+        ('VECTOR-SET!', vector_set, 3),
+        ('VECTOR-LENGTH', lambda v: len(vector(v)), 1),
+        ('VECTOR->LIST', lambda v: build(vector(v)), 1),
+        ('LIST->VECTOR', lambda ls: list(walk(ls)), 1),
+        ('VECTOR?', lambda x: type(x) is list, 1),
+        ('MAKE-TABLE', lambda: {}, 0),
+        ('TABLE-SET!', table_set, 3),
+        ('TABLE-DELETE!', table_delete, 2),
+        ('TABLE-CONTAINS?', table_contains, 2),
+        ('TABLE-KEYS', lambda t: build([key for key, _ in table(t).values()]), 1),
+        ('TABLE-COUNT', lambda t: len(table(t)), 1),
+        ('TABLE?', lambda x: type(x) is dict, 1),
+    )
+})
+# Take an optional fill value or default
+global_env[Symbol('MAKE-VECTOR')] = make_vector
+global_env[Symbol('TABLE-REF')] = table_ref
+global_env[Symbol('VECTOR')] = lambda *xs: list(xs)
+
+# Ports
+global_env.update(**{
+    Symbol(key): procedure(value, count) for key, value, count in (
+        ('OPEN-INPUT-FILE', open_input_file, 1),
+        ('OPEN-OUTPUT-FILE', open_output_file, 1),
+        ('CLOSE-PORT', close_port, 1),
+        ('CURRENT-INPUT-PORT', standard_input, 0),
+        ('CURRENT-OUTPUT-PORT', current_output, 0),
+        ('WITH-OUTPUT-TO-FILE', with_output_to_file, 2),
+        ('EOF-OBJECT?', lambda x: x is EOF, 1),
+        ('PORT?', lambda x: isinstance(x, Port), 1),
+    )
+})
+# Take an optional port
+global_env.update(**{
+    Symbol('READ-LINE'): read_line,
+    Symbol('READ-DATUM'): read_datum,
+    Symbol('WRITE-DATUM'): write_datum,
+    Symbol('WRITE-LINE'): write_line,
+})
+
+# List primitives check their argument types themselves
+global_env.update(**{
+    Symbol(key): counted(value, count) for key, value, count in (
+        ('CAR', car, 1),
+        ('CDR', cdr, 1),
+        ('CONS', cons, 2),
+        ('APPEND', append, 2),
+    )
+})
+
+# Native list functions
+global_env.update(**{
+    Symbol(key): procedure(value, count) for key, value, count in (
+        ('REVERSE', reverse, 1),
+        ('RANGE', range_, 2),
+        ('MAP', Stepped(map_, map_steps), 2),
+        ('FILTER', Stepped(filter_, filter_steps), 2),
+        ('FOLDL', Stepped(foldl, foldl_steps), 3),
+        ('ZIP', zip_, 2),
+        ('LENGTH', length, 1),
+        ('DROP', drop, 2),
+        ('TAKE', take, 2),
+        ('LIST-REF', list_ref, 2),
+        ('SUM', sum_, 1),
+        ('PRODUCT', product, 1),
+        ('MAX', max_, 1),
+        ('MIN', min_, 1),
+        ('STREAM-CAR', stream_car, 1),
+        ('STREAM-CDR', stream_cdr, 1),
+        ('STREAM-NULL?', stream_null, 1),
+        ('STREAM-RANGE', stream_range, 2),
+        ('STREAM-MAP', stream_map, 2),
+        ('STREAM-FILTER', stream_filter, 2),
+        ('STREAM-TAKE', stream_take, 2),
+        ('STREAM-FOLDL', stream_foldl, 3),
+        ('STREAM->LIST', stream_to_list, 1),
+    )
+})
+
 # Variadic Operators
 global_env.update(**{
     Symbol(key): variadic_op(value) for key, value in {
@@ -119,9 +712,12 @@ global_env.update(**{
     }.items()
 })
 
+# Takes an optional cache size
+global_env[Symbol('MEMOIZE')] = memoize
+
 # Add whole-list operators
 global_env[Symbol('PRINT')] = display
-global_env[Symbol('LIST')] = lambda ls: ls
+global_env[Symbol('LIST')] = lambda *ls: to_list(ls)
 
 # Generate car/cdr variants
 def make_variants():
@@ -144,7 +740,7 @@ def make_variants():
         return eval('lambda x: ' + body(word)) # Danger
 
     for word in doubles + triples + quadles:
-        global_env[Symbol(word.join('CR'))] = native(build_lambda(word))
+        global_env[Symbol(word.join('CR'))] = build_lambda(word)
 
 # Add them to environment
 make_variants()
@@ -0,0 +1,193 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Optional pass over a parsed program, run before it is evaluated:
+
+    * calls to pure builtins whose arguments are all literals are replaced
+      by their value, e.g. (* 2 3) becomes 6
+    * 'if' and 'cond' with literal tests keep only the branch taken
+    * car/cdr variants such as cadr are expanded to car and cdr
+    * quoted literals lose their quote
+
+A builtin is only trusted if its name is still bound to the builtin and the
+program never binds it, be it with define, define-memo, delete, a lambda or
+let, or in a file the program loads or requires. The program is scanned as a
+whole first, so optimizing reads the entire program before anything runs.
+"""
+
+__all__ = ['optimize']
+
+import re
+from fractions import Fraction
+
+from src.operators import global_env
+from src.primitives import Symbol, NIL, isatom
+
+# Forms with parts that are not expressions
+QUOTE, LAMBDA, LET, IF, COND = (
+    Symbol('quote'), Symbol('lambda'), Symbol('let'), Symbol('if'), Symbol('cond'))
+DEFINE, DEFINE_MEMO, DELETE, LOAD, REQUIRE = (
+    Symbol('define'), Symbol('define-memo'), Symbol('delete'), Symbol('load'),
+    Symbol('require'))
+CAR, CDR = Symbol('car'), Symbol('cdr')
+
+# Builtins without side effects whose value depends only on their arguments
+PURE = {Symbol(name) for name in (
+    '+', '-', '*', '/', '//', '++', '--', '~', 'MOD',
+    'SQRT', 'SIN', 'COS', 'TAN', 'NOT',
+    '<', '>', '=', '<=', '>=', '/=',
+    'RATIONAL', 'NUMERATOR', 'DENOMINATOR',
+    'INTEGER?', 'RATIONAL?', 'REAL?', 'NUMBER?', 'STRING?', 'SYMBOL?',
+    'ATOM?', 'NULL?',
+)}
+
+# Names of the car/cdr variants made by make_variants
+CXR = re.compile(r'C([AD]{2,4})R\Z')
+
+# The builtins the optimizer knows, as they were before any program ran
+BUILTINS = {name: global_env[name] for name in global_env
+            if name in PURE or CXR.match(name) or name in (CAR, CDR)}
+
+def isliteral(x):
+    """Does x evaluate to itself?"""
+    return x == NIL or (isatom(x) and not isinstance(x, Symbol))
+
+def foldable(x):
+    """Can x appear as a literal in code? Lists are built at run time."""
+    return (x == NIL or isinstance(x, (bool, int, float, Fraction))
+            or (isinstance(x, str) and not isinstance(x, Symbol)))
+
+def bound_names(forms, loaded=None):
+    """Every name the forms could bind or unbind, including in files they
+       load. Quoted code is included, since it can be evaluated."""
+    names = set()
+    loaded = set() if loaded is None else loaded
+    stack = list(forms)
+    while stack:
+        expr = stack.pop()
+        if isatom(expr) or expr == NIL:
+            continue
+        head = expr[0]
+        if head in (DEFINE, DEFINE_MEMO, LAMBDA) and len(expr) > 1:
+            target = expr[1]
+            names.update(target if isinstance(target, tuple) else (target,))
+        elif head == DELETE and len(expr) > 1:
+            names.add(expr[1])
+        elif head == LET and len(expr) > 1 and isinstance(expr[1], tuple):
+            names.update(binding[0] for binding in expr[1] if binding)
+        elif head in (LOAD, REQUIRE) and len(expr) > 1 and foldable(expr[1]):
+            names.update(loaded_names(expr[1], loaded))
+        stack.extend(item for item in expr if isinstance(item, tuple))
+    return names
+
+def loaded_names(path, loaded):
+    """Names bound by the file at path, or none if it cannot be read now"""
+    from src.image import read_forms
+    if path in loaded:
+        return ()
+    loaded.add(path)
+    try:
+        return bound_names(read_forms(path), loaded)
+    except Exception:
+        return ()
+
+class Optimizer(object):
+    """Rewrites expressions, never touching names in 'rebound'"""
+
+    def __init__(self, rebound):
+        self.rebound = rebound
+
+    def builtin(self, name):
+        """The builtin name is certain to mean while the program runs, or
+           None"""
+        function = BUILTINS.get(name)
+        if function is None or name in self.rebound:
+            return None
+        try:
+            if global_env[name] is not function:
+                return None
+        except NameError:
+            return None
+        return function
+
+    def expand(self, name):
+        """Letters of the car/cdr variant name, or None"""
+        match = CXR.match(name)
+        if match is None or not all(map(self.builtin, (name, CAR, CDR))):
+            return None
+        return match.group(1)
+
+    def body(self, exprs):
+        return tuple(self.expr(expr) for expr in exprs)
+
+    def expr(self, expr):
+        if isatom(expr) or expr == NIL:
+            return expr
+        head, rest = expr[0], expr[1:]
+        if head == QUOTE:
+            if len(rest) == 1 and isliteral(rest[0]):
+                return rest[0]
+            return expr
+        elif head in (LAMBDA, DEFINE, DEFINE_MEMO) and rest:
+            # The formals, or the name being defined, stay as they are
+            return (head, rest[0]) + self.body(rest[1:])
+        elif head == LET and rest and isinstance(rest[0], tuple):
+            bindings = tuple(
+                (binding[0],) + self.body(binding[1:]) for binding in rest[0])
+            return (head, bindings) + self.body(rest[1:])
+        elif head == IF and len(rest) == 3:
+            test, consequent, alternative = self.body(rest)
+            if isliteral(test):
+                return consequent if test else alternative
+            return head, test, consequent, alternative
+        elif head == COND:
+            return self.cond(rest)
+        elif head in (DELETE, LOAD, REQUIRE):
+            return expr
+        return self.application(self.body(expr))
+
+    def cond(self, clauses):
+        kept = []
+        for clause in clauses:
+            if not isinstance(clause, tuple) or len(clause) != 2:
+                return (COND,) + clauses
+            test, body = self.body(clause)
+            if isliteral(test):
+                if not test:
+                    continue
+                if not kept:
+                    return body
+                # Later clauses are never reached
+                kept.append((test, body))
+                break
+            kept.append((test, body))
+        return (COND,) + tuple(kept) if kept else NIL
+
+    def application(self, expr):
+        head, args = expr[0], expr[1:]
+        if not isinstance(head, Symbol):
+            return expr
+        function = self.builtin(head) if head in PURE else None
+        if function is not None and all(map(isliteral, args)):
+            try:
+                value = function(*args)
+            except Exception:
+                # Let the program fail when it runs
+                return expr
+            if foldable(value):
+                return value
+            return expr
+        letters = self.expand(head)
+        if letters is not None and len(args) == 1:
+            inlined = args[0]
+            for letter in reversed(letters):
+                inlined = (CAR if letter == 'A' else CDR, inlined)
+            return inlined
+        return expr
+
+def optimize(forms):
+    """Optimized copy of a program given as a sequence of forms"""
+    forms = list(forms)
+    optimizer = Optimizer(bound_names(forms))
+    return [optimizer.expr(form) for form in forms]
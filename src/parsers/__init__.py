@@ -1,6 +1,10 @@
 # encoding: utf-8
 from __future__ import print_function, unicode_literals
 
-from src.parsers.interactive_parser import parse
 from src.parsers.file_parser import parse_file
 
+def parse(prompt=None):
+    '''Read an s-expression interactively. The interactive parser needs
+       readline, so it is only imported when first used.'''
+    from src.parsers.interactive_parser import parse
+    return parse(prompt)
@@ -0,0 +1,198 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+'''
+Single pass reader that turns text into s-expressions one at a time.
+Tokens are recognized with one regular expression per line (strings cannot
+span lines), and brackets are matched with an explicit stack, so reading a
+huge file never needs more memory than its largest top-level form. The
+stack lives in a Reader between chunks of input, so the same reader works
+for files, the repl and network input.
+'''
+
+__all__ = ['Reader', 'read_stream', 'read_atom', 'tokenize']
+
+import re
+from fractions import Fraction
+
+from src.parsers.utils import *
+from src.primitives import Symbol, NIL
+
+# One alternative per kind of token. Anything that is not whitespace, a
+# comment, punctuation or a string is an atom and is classified afterwards.
+TOKEN = re.compile(r'''
+      (?P<space>\s+)
+    | (?P<comment>;.*)
+    | (?P<punctuation>[()\[\]{}'])
+    | (?P<string>"(?:[^"\\\n\r]|\\.)*")
+    | (?P<atom>[^\s()\[\]{}';"]+)
+    | (?P<error>.)
+''', re.VERBOSE)
+
+# Atoms, checked in this order
+NIL_ATOM = re.compile(r'(?i)nil\Z')
+TRUE = re.compile(r'#[tT]\Z')
+FALSE = re.compile(r'#[fF]\Z')
+RATIONAL = re.compile(r'-?\d+/\d+\Z')
+REAL = re.compile(r'[+-]?\d+\.\d*([eE][+-]?\d+)?\Z')
+DECIMAL = re.compile(r'-?(0|[1-9])\d*\Z')
+IDENTIFIER = re.compile(r'[A-Za-z\-./_~:*+=!<>?&^%@$|][A-Za-z0-9\-./_~:*+=!<>?&^%@$|]*\Z')
+
+# Head of the form a quote mark reads as
+QUOTE_FORM = Symbol('quote')
+
+def position(line, column):
+    return 'line {}, column {}'.format(line, column)
+
+def read_atom(text, line=0, column=0):
+    '''Convert the text of an atom into a value'''
+    if NIL_ATOM.match(text):
+        return NIL
+    elif TRUE.match(text):
+        return True
+    elif FALSE.match(text):
+        return False
+    elif RATIONAL.match(text):
+        try:
+            value = Fraction(text)
+        except ZeroDivisionError:
+            raise ParseError('Zero denominator in "{}" at {}'.format(
+                text, position(line, column)))
+        # Whole rationals such as 4/2 are integers
+        return value.numerator if value.denominator == 1 else value
+    elif REAL.match(text):
+        return float(text)
+    elif DECIMAL.match(text):
+        return int(text)
+    elif IDENTIFIER.match(text):
+        return Symbol(text)
+    raise ParseError('Invalid token "{}" at {}'.format(text, position(line, column)))
+
+def tokenize_line(line, number):
+    '''Yield (kind, value, line, column) for each token in line number
+       'number'. Kind is 'punctuation' or 'atom'; strings and atoms are
+       already converted.'''
+    for match in TOKEN.finditer(line):
+        kind = match.lastgroup
+        if kind == 'space' or kind == 'comment':
+            continue
+        text, column = match.group(), match.start() + 1
+        if kind == 'punctuation':
+            yield kind, text, number, column
+        elif kind == 'string':
+            yield 'atom', text[1:-1], number, column
+        elif kind == 'atom':
+            yield kind, read_atom(text, number, column), number, column
+        else:
+            raise ParseError('Unexpected character "{}" at {}'.format(
+                text, position(number, column)))
+
+def tokenize(stream):
+    '''Yield the tokens of every line in stream, see tokenize_line'''
+    for number, line in enumerate(stream, 1):
+        for token in tokenize_line(line, number):
+            yield token
+
+class Reader(object):
+    '''
+    Incremental reader. Text is fed in chunks that may end anywhere, even in
+    the middle of an atom, and each call to feed returns the forms the chunk
+    completed. Nothing ever waits for input, so the same reader serves files,
+    terminals and sockets. A reader that raised an error starts afresh.
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        '''Forget any partial input'''
+        # Each entry is [left bracket or quote, items, line, column]
+        self.stack = []
+        # Text after the last complete line
+        self.rest = ''
+        self.line = 0
+        # Offsets in the last line read where the text after each form it
+        # completed begins
+        self.ends = []
+
+    def pending(self):
+        '''Is a form still waiting to be completed?'''
+        return bool(self.stack) or bool(self.rest.strip())
+
+    def feed(self, text):
+        '''Read a chunk of text and return the list of forms it completed'''
+        if '\n' not in text:
+            self.rest += text
+            return []
+        lines = (self.rest + text).split('\n')
+        self.rest = lines.pop()
+        forms = []
+        try:
+            for line in lines:
+                self.read_line(line, forms)
+        except ParseError:
+            self.reset()
+            raise
+        return forms
+
+    def close(self):
+        '''Read the rest of the input and return the forms it completed.
+           Raise an error if a form is left open.'''
+        forms = []
+        try:
+            self.read_line(self.rest, forms)
+            if self.stack:
+                left, _, line, column = self.stack[-1]
+                if left == QUOTE:
+                    raise ParseError("Expected expression after quote at {}".format(
+                        position(line, column)))
+                raise UnbalancedError("Expected '{}' to close '{}' opened at {}".format(
+                    LEFT2RIGHT[left], left, position(line, column)))
+        finally:
+            self.reset()
+        return forms
+
+    def read_line(self, text, forms):
+        '''Read one complete line, appending the forms it completes'''
+        self.line += 1
+        stack = self.stack
+        ends = self.ends = []
+        done = len(forms)
+        for kind, token, line, column in tokenize_line(text, self.line):
+            if done + len(ends) < len(forms):
+                ends.append(column - 1)
+            if kind == 'punctuation':
+                if token in LEFT or token == QUOTE:
+                    stack.append([token, [], line, column])
+                    continue
+                elif not stack:
+                    raise UnbalancedError("Expression cannot begin with '{}' at {}".format(
+                        token, position(line, column)))
+                left, items, _, _ = stack.pop()
+                if left == QUOTE:
+                    raise ParseError("Expected expression after quote at {}".format(
+                        position(line, column)))
+                elif (left, token) not in MATCHES:
+                    raise UnbalancedError("Expected '{}' at {}".format(
+                        LEFT2RIGHT[left], position(line, column)))
+                token = tuple(items)
+
+            # A complete expression closes any quotes waiting for it
+            while stack and stack[-1][0] == QUOTE:
+                stack.pop()
+                token = (QUOTE_FORM, token)
+            if stack:
+                stack[-1][1].append(token)
+            else:
+                forms.append(token)
+        if done + len(ends) < len(forms):
+            ends.append(len(text))
+
+def read_stream(stream):
+    '''Yield each top-level s-expression in stream as soon as it is read'''
+    reader = Reader()
+    for line in stream:
+        for form in reader.feed(line):
+            yield form
+    for form in reader.close():
+        yield form
@@ -3,7 +3,7 @@ from __future__ import print_function, unicode_literals
 
 '''Define some utility functions and classes'''
 
-# Constants used by both parsers
+# Constants used by the reader
 PUNCTUATION = (
     LPAREN,
     RPAREN,
@@ -48,23 +48,3 @@ class ParseError(Exception):
 class UnbalancedError(ParseError):
     '''Unbalanced parentheses, brackets, or braces'''
     pass
-
-def balance(left, right):
-    '''Are left and right brackets matched?'''
-    if (left, right) not in MATCHES:
-        raise UnbalancedError("Expected '{}'".format(LEFT2RIGHT[left]))
-
-def convert(f):
-    '''Parse action that converts the token using unary function f'''
-    return lambda string, location, tokens: f(tokens[0])
-
-def constant(value):
-    '''Parse action that returns a constant value'''
-    return lambda *args: value
-
-def do(parser, action):
-    '''Make a copy (since we have different parsers using the same
-       sub-parsers) and set the parse action
-    '''
-    return parser.copy().setParseAction(action)
-
@@ -0,0 +1,220 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Ports for reading and writing data a line or a datum at a time, so scripts
+can filter input of any size:
+
+    (define (copy)
+        (let [(line (read-line))]
+            (if (eof-object? line)
+                nil
+                (begin (write-line line) (copy)))))
+
+Input ports read from their stream only as far as the line or datum asked
+for. After a datum, read-line returns the rest of its line if anything but
+blanks and comments is left there. Output ports write through a buffer;
+ports still open when the interpreter exits are flushed and closed then.
+Without a port argument the builtins use stdin and the current output,
+which 'with-output-to-file' redirects.
+"""
+
+__all__ = ['Port', 'EOF', 'standard_input', 'current_output',
+           'open_input_file', 'open_output_file', 'close_port', 'read_line',
+           'read_datum', 'write_datum', 'write_line', 'with_output_to_file']
+
+import atexit
+import math
+import sys
+from collections import deque
+from fractions import Fraction
+
+from src.primitives import *
+from src.parsers.reader import Reader
+
+# Output buffer size of file ports
+BUFFER_SIZE = 1 << 16
+
+class Eof(object):
+    """Value read at the end of input"""
+
+    def __str__(self):
+        return '#{eof}'
+
+EOF = Eof()
+
+class Port(object):
+    """Input or output port on a text stream"""
+
+    def __init__(self, stream, name, output=False):
+        self.stream = stream
+        self.name = name
+        self.output = output
+        # Forms read ahead by the datum reader, which reads whole lines, and
+        # where the text after each of them begins in the last line read
+        self.reader = Reader()
+        self.forms = deque()
+        self.ends = deque()
+        self.line = ''
+        self.unread = 0
+
+    def __str__(self):
+        return '#{{port {}}}'.format(self.name)
+
+    def read_line(self):
+        if self.forms or self.reader.pending():
+            # The rest of the line the datum reader read ahead
+            line = self.line[self.unread:]
+            self.forms.clear()
+            self.reader.reset()
+        else:
+            line = self.stream.readline()
+            if not line:
+                return EOF
+        return line[:-1] if line.endswith('\n') else line
+
+    def read_datum(self):
+        forms = self.forms
+        while not forms:
+            line = self.stream.readline()
+            if not line:
+                forms.extend(self.reader.close())
+                if not forms:
+                    return EOF
+                break
+            # A last line without a newline is still complete
+            if not line.endswith('\n'):
+                line += '\n'
+            forms.extend(self.reader.feed(line))
+            self.line = line
+            self.ends = deque(self.reader.ends)
+        if self.ends:
+            self.unread = self.ends.popleft()
+        return to_list(forms.popleft())
+
+    def write(self, text):
+        self.stream.write(text)
+
+    def close(self):
+        open_ports.discard(self)
+        if self.stream not in (sys.stdin, sys.stdout, sys.stderr):
+            self.stream.close()
+        return NIL
+
+# Output ports to flush and close at exit
+open_ports = set()
+
+@atexit.register
+def close_ports():
+    for port in list(open_ports):
+        port.close()
+
+# Made when first used, so replacing sys.stdin before then is honoured
+stdin = None
+
+def standard_input():
+    global stdin
+    if stdin is None or stdin.stream is not sys.stdin:
+        stdin = Port(sys.stdin, 'stdin')
+    return stdin
+
+def current_output():
+    """Port on the current output, which may be redirected"""
+    return Port(sys.stdout, 'stdout', True)
+
+def input_port(port):
+    if port is None:
+        return standard_input()
+    elif not isinstance(port, Port) or port.output:
+        raise TypeError("Wrong argument type")
+    return port
+
+def output_port(port):
+    if port is None:
+        return current_output()
+    elif not isinstance(port, Port) or not port.output:
+        raise TypeError("Wrong argument type")
+    return port
+
+def open_input_file(path):
+    return Port(open(path), path)
+
+def open_output_file(path):
+    port = Port(open(path, 'w', buffering=BUFFER_SIZE), path, True)
+    open_ports.add(port)
+    return port
+
+def close_port(port):
+    if not isinstance(port, Port):
+        raise TypeError("Wrong argument type")
+    return port.close()
+
+def read_line(port=None):
+    """Next line of the port without its newline, or the eof object"""
+    return input_port(port).read_line()
+
+def read_datum(port=None):
+    """Next s-expression of the port, or the eof object"""
+    return input_port(port).read_datum()
+
+def datum(x):
+    """Text of x that reads back as x"""
+    if x is True:
+        return '#t'
+    elif x is False:
+        return '#f'
+    elif x == NIL:
+        return 'nil'
+    elif isinstance(x, Symbol):
+        return str(x)
+    elif isinstance(x, str):
+        if '"' in x or '\n' in x or '\r' in x:
+            raise Exception('Cannot write string with quotes or newlines: "{}"'
+                            .format(x))
+        return '"' + x + '"'
+    elif isinstance(x, (int, Fraction)):
+        return str(x)
+    elif isinstance(x, float):
+        if math.isinf(x) or math.isnan(x):
+            raise Exception('Cannot write "{}" as a datum'.format(x))
+        text = repr(x)
+        # The reader needs a decimal point, as in 1.0e+20
+        if '.' not in text:
+            mantissa, _, exponent = text.partition('e')
+            text = mantissa + '.0' + ('e' + exponent if exponent else '')
+        return text
+    elif isinstance(x, (Pair, tuple)):
+        items = []
+        while isinstance(x, Pair):
+            items.append(datum(x.car))
+            x = x.cdr
+        if isinstance(x, tuple):
+            items.extend(datum(item) for item in x)
+        elif x != NIL:
+            raise Exception('Cannot write "{}" as a datum'.format(str_list(x)))
+        return '(' + ' '.join(items) + ')'
+    raise Exception('Cannot write "{}" as a datum'.format(str_list(x)))
+
+def write_datum(x, port=None):
+    """Write x so that read-datum reads it back, followed by a newline"""
+    output_port(port).write(datum(x) + '\n')
+    return NIL
+
+def write_line(text, port=None):
+    """Write a string or the printed form of any value and a newline"""
+    output = output_port(port)
+    if not isinstance(text, str) or isinstance(text, Symbol):
+        text = str_list(text)
+    output.write(text + '\n')
+    return NIL
+
+def with_output_to_file(path, thunk):
+    """Call thunk with the current output going to the file at path"""
+    from src.eval import apply
+    port = open_output_file(path)
+    stdout, sys.stdout = sys.stdout, port.stream
+    try:
+        return apply(thunk, ())
+    finally:
+        sys.stdout = stdout
+        port.close()
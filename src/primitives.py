@@ -8,123 +8,322 @@ except NameError:
     # Python 3
     pass
 
-from functools import wraps
+from array import array
 
 __all__ = [
     'NIL', 'single', 'cons', 'car', 'cdr', 'splits', 'isnil', 'isatom', 'append',
-    'str_list', 'Symbol', 'Environment', 'Closure', 'Thunk',
+    'str_list', 'Symbol', 'Environment', 'Closure', 'Thunk', 'Scope', 'Cell',
+    'UNBOUND', 'toplevel', 'Pair', 'to_list', 'to_tuple', 'Promise', 'force',
 ]
 
 NIL = ()
 
+# Every symbol ever made, keyed by the spelling it was made from and by its
+# upper case name
+symbols = {}
+
 class Symbol(str):
     """
     We need to use something string-like for symbols but we want to be able to
     differentiate them using isinstance(thing, type)
+
+    Symbols are interned: each name maps to exactly one Symbol object, so
+    comparing two symbols usually stops at the identity check, their hash is
+    computed once, and reading the same name many times allocates nothing.
     """
+    __slots__ = ()
 
     def __new__(cls, value):
-        return str.__new__(cls, value.upper())
+        symbol = symbols.get(value)
+        if symbol is None:
+            name = value.upper()
+            symbol = symbols.get(name)
+            if symbol is None:
+                symbol = symbols[name] = str.__new__(cls, name)
+            symbols[value] = symbol
+        return symbol
+
+    def __reduce__(self):
+        """Unpickle through the symbol table"""
+        return Symbol, (str(self),)
+
+class Pair(object):
+    """Cons cell holding the head of a list and the rest of it"""
+    __slots__ = ('car', 'cdr')
+
+    def __init__(self, car, cdr):
+        self.car = car
+        self.cdr = cdr
+
+    def __iter__(self):
+        ls = self
+        while isinstance(ls, Pair):
+            yield ls.car
+            ls = ls.cdr
+
+    def __len__(self):
+        count, ls = 0, self
+        while isinstance(ls, Pair):
+            count, ls = count + 1, ls.cdr
+        return count
+
+    def __bool__(self):
+        """Never empty; avoid counting the list for truth tests"""
+        return True
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        a, b = self, other
+        while isinstance(a, Pair) and isinstance(b, Pair):
+            if a.car != b.car:
+                return False
+            a, b = a.cdr, b.cdr
+        return not isinstance(a, Pair) and not isinstance(b, Pair) and a == b
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return str_list(self)
 
 class Thunk(object):
-    """Wrap an expression that can be further simplified"""
-    def __init__(self, value):
-        self.value = value
+    """Wrap a closure application in tail position that can be further
+       simplified. 'frame' already holds the arguments."""
+    __slots__ = ('function', 'frame')
+
+    def __init__(self, function, frame):
+        self.function = function
+        self.frame = frame
 
 class Closure(object):
-    """Expression 'body' closes over environment 'env'"""
+    """Expression 'body' closes over environment 'env'. 'locals' pads the
+       frame with a slot for every name the body defines. 'name' says where
+       the closure was defined, for error reports and profiles."""
 
-    def __init__(self, body, formals, env):
+    def __init__(self, body, formals, env, locals=(), name=None):
         self.body = body
         self.formals = formals
+        self.arity = len(formals)
         self.env = env
+        self.locals = locals
+        self.name = name
 
     def __repr__(self):
         return '<CLOSURE>'
 
+class Promise(object):
+    """Value computed by calling 'thunk' when first forced. A transient
+       promise computes it again each time instead of keeping it, so a
+       stream built from them never holds on to the elements already
+       walked past."""
+    __slots__ = ('thunk', 'value', 'transient')
+
+    def __init__(self, thunk, transient=False):
+        self.thunk = thunk
+        self.value = None
+        self.transient = transient
+
+    def __repr__(self):
+        return '<PROMISE>'
+
+    def force(self):
+        thunk = self.thunk
+        if thunk is None:
+            return self.value
+        value = thunk()
+        if not self.transient:
+            self.value, self.thunk = value, None
+        return value
+
+def force(x):
+    """Value of a promise; anything else is already a value"""
+    if type(x) is Promise:
+        return x.force()
+    return x
+
+class Unbound(object):
+    """Marks a slot or cell that has no value yet"""
+
+    def __repr__(self):
+        return '<UNBOUND>'
+
+UNBOUND = Unbound()
+
+class Cell(object):
+    """Box holding the value of a top-level binding. Analyzed code keeps a
+       direct reference to the cell instead of looking the name up."""
+    __slots__ = ('name', 'value')
+
+    def __init__(self, name, value=UNBOUND):
+        self.name = name
+        self.value = value
+
+    def get(self):
+        """Get value or fail if the name was never defined"""
+        value = self.value
+        if value is UNBOUND:
+            raise NameError("No binding for name '{}' in scope".format(self.name))
+        return value
+
+class Scope(object):
+    """
+    Names bound by a lambda or let, known while analyzing its body. At run time
+    each scope corresponds to a frame: a list holding the enclosing frame (or
+    the top-level Environment) in slot 0 and the value of names[i] in slot
+    i + 1. 'defines' holds names that may be read before they are bound.
+    Scopes of closures are named after the closure.
+    """
+
+    def __init__(self, names, parent, name=None):
+        self.names = list(names)
+        self.parent = parent
+        self.name = name
+        self.defines = set()
+
+    def __repr__(self):
+        return "<SCOPE>"
+
+    def index(self, key):
+        """Get frame slot of key or None"""
+        try:
+            return self.names.index(key) + 1
+        except ValueError:
+            return None
+
+    def add(self, key):
+        """Make room for key in this scope and return its slot"""
+        index = self.index(key)
+        if index is None:
+            self.names.append(key)
+            index = len(self.names)
+        return index
+
+    def lookup(self, key):
+        """Find (depth, index, scope) address of key or None if key is
+           top-level"""
+        scope, depth = self, 0
+        while isinstance(scope, Scope):
+            index = scope.index(key)
+            if index is not None:
+                return depth, index, scope
+            scope, depth = scope.parent, depth + 1
+        return None
+
 class Environment(object):
-    """Stack of bindings mapping symbols to values"""
+    """
+    Top-level bindings mapping symbols to cells. An environment created with
+    a scope starts with a copy of the bindings of that scope, so defining names
+    in it never affects the parent. 'required' holds the resolved paths of
+    the files required in it, starting with those of the scope.
+    """
 
     def __init__(self, scope=None, **bindings):
-        self.next = scope
-        self.bindings = bindings
+        self.cells = {}
+        self.required = set()
+        if scope is not None:
+            self.update((key, scope[key]) for key in scope)
+            self.required.update(getattr(scope, 'required', ()))
+        self.update(bindings)
 
     def __repr__(self):
         return "<ENV>"
 
+    def lookup(self, key):
+        """Top-level names have no frame address"""
+        return None
+
+    def cell(self, key):
+        """Get cell for key, creating an unbound one if necessary"""
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = Cell(key)
+        return cell
+
     def __getitem__(self, key):
-        """Find key starting in most local scope"""
-        scope = self
-        while scope is not None:
-            if key in scope.bindings:
-                return scope.bindings[key]
-            scope = scope.next
-        raise NameError("No binding for name '{}' in scope".format(key))
+        """Find value bound to key"""
+        cell = self.cells.get(key)
+        if cell is None:
+            raise NameError("No binding for name '{}' in scope".format(key))
+        return cell.get()
 
     def __setitem__(self, key, value):
-        """Map key to value in current scope"""
-        self.bindings[key] = value
+        """Map key to value"""
+        self.cell(key).value = value
 
     def pop(self, key):
         """Remove key from environment"""
-        scope = self
-        while scope is not None:
-            if key in scope.bindings:
-                return binding.pop(key)
-            scope = scope.next
-        raise NameError("No binding for name '{}' in scope".format(key))
+        value = self[key]
+        self.cells[key].value = UNBOUND
+        return value
 
-    def update(self, **kwargs):
-        """Add bindings to current scope"""
-        self.bindings.update(**kwargs)
+    def update(self, *args, **kwargs):
+        """Add bindings"""
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
 
     def __iter__(self):
         """Get all keys defined in environment"""
-        scope = self
-        while scope is not None:
-            for key in scope.bindings:
+        for key, cell in self.cells.items():
+            if cell.value is not UNBOUND:
                 yield key
-            scope = scope.next
-
-def type_check(*arg_types, **kw_types):
-    """Check types of arguments for function"""
-    def make_decorator(function):
-        @wraps(function)
-        def checked(*args, **kwargs):
-            if len(args) != len(arg_types):
-                raise TypeError("Wrong number of positional arguments")
-            for arg, type in zip(args, arg_types):
-                if not isinstance(arg, type):
-                    raise TypeError("Wrong argument type")
-            for key, value in kwargs.items():
-                if key in kw_types and not isinstance(value, kw_types[kw]):
-                    raise TypeError("Wrong argument type")
-            return function(*args, **kwargs)
-        return checked
-    return make_decorator
+
+def toplevel(env):
+    """Get top-level Environment of a frame or a scope"""
+    while not isinstance(env, Environment):
+        env = env.parent if isinstance(env, Scope) else env[0]
+    return env
 
 def single(x):
     '''Making singleton tuples is ugly'''
     return x,
 
-@type_check(object, tuple)
+# Lists are chains of Pairs ending in NIL. Parsed code is still made of
+# tuples, so the list primitives accept both.
+LIST_TYPES = (Pair, tuple)
+
+# The list primitives are called by the evaluator and by every builtin that
+# walks a list, so they test for the expected types directly and only check
+# for errors once the fast paths have failed.
+
+def wrong_type():
+    raise TypeError("Wrong argument type")
+
 def cons(a, b):
     """Push value on front of list"""
-    return single(a) + b
+    if type(b) is Pair or b is NIL:
+        return Pair(a, b)
+    elif not isinstance(b, LIST_TYPES):
+        wrong_type()
+    return Pair(a, to_list(b))
 
-@type_check(tuple)
 def car(x):
     """Get value on front of list"""
+    if type(x) is Pair:
+        return x.car
+    elif not isinstance(x, LIST_TYPES):
+        wrong_type()
+    elif not x:
+        raise IndexError("Cannot take car of nil")
     return x[0]
 
-@type_check(tuple)
 def cdr(x):
     """Get all values comprising tail of list"""
+    if type(x) is Pair:
+        return x.cdr
+    elif not isinstance(x, LIST_TYPES):
+        wrong_type()
     return x[1:]
 
-@type_check(tuple)
 def splits(x):
     """Split list into head and tail"""
+    if type(x) is Pair:
+        return x.car, x.cdr
+    elif not isinstance(x, LIST_TYPES):
+        wrong_type()
     return x[0], x[1:]
 
 def isnil(x):
@@ -133,29 +332,62 @@ def isnil(x):
 
 def isatom(x):
     """Is x a non-composite object?"""
-    return not isinstance(x, tuple)
+    return not isinstance(x, LIST_TYPES)
 
 def isenv(x):
     """Is x an environment?"""
     return isinstance(x, Environment)
 
+def to_list(x):
+    """Turn tuples (and nested tuples) into lists of Pairs"""
+    if not isinstance(x, tuple):
+        return x
+    ls = NIL
+    for item in reversed(x):
+        ls = Pair(to_list(item), ls)
+    return ls
+
+def to_tuple(x):
+    """Turn lists of Pairs (and nested lists) into tuples"""
+    if not isinstance(x, Pair):
+        return x
+    return tuple(to_tuple(item) for item in x)
+
 def str_list(ls):
     if isatom(ls):
         if ls is True:
             return '#t'
         elif ls is False:
             return '#f'
-        elif hasattr(ls, '__call__'):
+        elif hasattr(ls, '__call__') and not isinstance(ls, Closure):
             return '#{native-code}'
+        elif isinstance(ls, array):
+            return '#f64(' + ' '.join(str_list(x) for x in ls) + ')'
+        elif type(ls) is list:
+            return '#(' + ' '.join(str_list(x) for x in ls) + ')'
+        elif type(ls) is dict:
+            # Tables map a typed key to the key and its value
+            return '#table(' + ' '.join(
+                '(' + str_list(key) + ' ' + str_list(value) + ')'
+                for key, value in ls.values()) + ')'
         else:
             return str(ls)
     elif ls == NIL:
         return 'nil'
-    else:
-        return '(' + ' '.join(str_list(x) for x in ls) + ')'
+    items = [str_list(x) for x in ls]
+    if type(ls) is Pair:
+        # Streams end in a promise of the rest
+        while type(ls) is Pair:
+            ls = ls.cdr
+        if type(ls) is Promise:
+            items.append('...')
+    return '(' + ' '.join(items) + ')'
 
-@type_check(tuple, tuple)
 def append(ls1, ls2):
     """Append ls2 to ls1"""
-    return ls1 + ls2
-
+    if not isinstance(ls1, LIST_TYPES) or not isinstance(ls2, LIST_TYPES):
+        wrong_type()
+    out = to_list(ls2)
+    for item in reversed(tuple(ls1)):
+        out = Pair(item, out)
+    return out
@@ -0,0 +1,139 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Profiles lisp programs by closure. While a profile is running, every closure
+application is reported to it (see 'monitor' in eval.py), and it records per
+closure:
+
+    calls       applications from a non-tail position
+    tail        times the tail-call trampoline bounced into the closure
+    inclusive   seconds spent in the closure and everything it called
+    exclusive   seconds spent in the closure itself
+
+Closures are keyed by their qualified name, such as 'FACTORIAL/LOOP'.
+Anonymous closures are called 'lambda'. 'report' prints a table sorted by
+exclusive time, 'save' writes collapsed stacks for flamegraph tools.
+"""
+
+__all__ = ['start', 'stop', 'report', 'save']
+
+import sys
+import time
+
+from src.primitives import NIL
+
+clock = getattr(time, 'perf_counter', time.time)
+
+class Stats(object):
+    """Totals for one closure name"""
+    __slots__ = ('calls', 'tail', 'inclusive', 'exclusive')
+
+    def __init__(self):
+        self.calls = self.tail = 0
+        self.inclusive = self.exclusive = 0.0
+
+class Profile(object):
+    """Monitor recording where time goes"""
+
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}
+        # Each frame is [name, start time, time spent in callees]
+        self.frames = []
+        self.active = {}
+
+    def stats_for(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = Stats()
+        return stats
+
+    def push(self, name):
+        self.frames.append([name, clock(), 0.0])
+        self.active[name] = self.active.get(name, 0) + 1
+
+    def pop(self):
+        now = clock()
+        name, start, callees = self.frames.pop()
+        elapsed = now - start
+        stats = self.stats_for(name)
+        stats.exclusive += elapsed - callees
+        self.active[name] -= 1
+        if not self.active[name]:
+            # Only the outermost of several recursive calls counts
+            stats.inclusive += elapsed
+        stack = ';'.join([frame[0] for frame in self.frames] + [name])
+        self.stacks[stack] = self.stacks.get(stack, 0.0) + elapsed - callees
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+    def call(self, function):
+        name = function.name or 'lambda'
+        self.stats_for(name).calls += 1
+        self.push(name)
+
+    def bounce(self, function):
+        """A tail call replaces the calling closure's frame"""
+        if not self.frames:
+            return
+        name = function.name or 'lambda'
+        self.pop()
+        self.stats_for(name).tail += 1
+        self.push(name)
+
+    def leave(self):
+        if self.frames:
+            self.pop()
+
+    def tick(self):
+        """Time in builtin loops counts for the closure that called them"""
+
+    def report(self):
+        """Lines of a table sorted by exclusive time"""
+        lines = ['{:>10} {:>10} {:>12} {:>12}  {}'.format(
+            'calls', 'tail', 'inclusive', 'exclusive', 'name')]
+        ranked = sorted(self.stats.items(), key=lambda item: -item[1].exclusive)
+        for name, stats in ranked:
+            lines.append('{:>10} {:>10} {:>12.6f} {:>12.6f}  {}'.format(
+                stats.calls, stats.tail, stats.inclusive, stats.exclusive, name))
+        return lines
+
+    def collapsed(self):
+        """Lines of 'outer;inner microseconds' for flamegraph tools"""
+        return [
+            '{} {}'.format(stack, int(round(seconds * 1e6)))
+            for stack, seconds in sorted(self.stacks.items())
+        ]
+
+# The running or most recently stopped profile
+current = None
+
+def start():
+    """Throw away any previous profile and start a new one"""
+    from src.eval import monitor
+    global current
+    stop()
+    current = Profile()
+    monitor(current)
+    return NIL
+
+def stop():
+    """Stop recording, keeping what was recorded"""
+    from src.eval import monitors, unmonitor
+    if current in monitors:
+        unmonitor(current)
+    return NIL
+
+def report(stream=None):
+    """Print the table of the current profile"""
+    for line in current.report() if current else ['No profile recorded']:
+        print(line, file=stream or sys.stdout)
+    return NIL
+
+def save(path):
+    """Write collapsed stacks of the current profile to path"""
+    with open(path, 'w') as stream:
+        for line in current.collapsed() if current else []:
+            print(line, file=stream)
+    return NIL
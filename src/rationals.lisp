@@ -1,67 +1,39 @@
-;; Define a rational as a list of two integers.
-(define (rational n d)
-    (if (= d 0)
-        (error "Denominator cannot be zero")
-        (let ([g (gcd n d)]
-              [rn (// n g)]
-              [rd (// d g)])
-        (if (< rd 0)
-            (list (~ rn) (~ rd))
-            (list rn rd)))))
-
-;; Get numerator
-(define (numerator rational)
-    (car rational))
-
-;; Get denominator
-(define (denominator rational)
-    (car (cdr rational)))
+;; Rationals are a builtin numeric type (written like 3/4) that works with
+;; the usual arithmetic and comparison operators. The builtins 'rational',
+;; 'numerator' and 'denominator' build and take them apart. These functions
+;; are kept for code written against the old list-based rationals.
 
 ;; Arithmetic operators
 (define (rational+ x y)
-    (let ([dx (denominator x)]
-          [dy (denominator y)]
-          [nx (numerator x)]
-          [ny (numerator y)]
-          [new-d (* dx dy)]
-          [new-n (+ (* nx dy) (* dx ny))])
-    (rational new-n new-d)))
+    (+ x y))
 
 (define (rational~ x)
-    (rational (~ (numerator x)) (denominator x)))
+    (~ x))
 
 (define (rational- x y)
-    (rational+ x (rational~ y)))
+    (- x y))
 
 (define (rational* x y)
-    (let ([dx (denominator x)]
-          [dy (denominator y)]
-          [nx (numerator x)]
-          [ny (numerator y)])
-    (rational (* nx ny) (* dx dy))))
+    (* x y))
 
 (define (rational/ x y)
-    (rational* x (rational (denominator y) (numerator y))))
+    (rational x y))
 
 ;; Comparisons
 (define (rational< x y)
-    (let ([dx (denominator x)]
-          [dy (denominator y)]
-          [nx (numerator x)]
-          [ny (numerator y)])
-    (< (* nx dy) (* dx ny))))
+    (< x y))
 
 (define (rational= x y)
-    (and (not (rational< x y)) (not (rational< y x))))
+    (= x y))
 
 (define (rational> x y)
-    (and (not (rational< x y)) (rational< y x)))
+    (> x y))
 
 (define (rational<= x y)
-    (or (rational< x y) (rational= x y)))
+    (<= x y))
 
 (define (rational>= x y)
-    (or (rational> x y) (rational= x y)))
+    (>= x y))
 
 ;; Conversions
 (define (rational->float x)
@@ -69,4 +41,3 @@
 
 (define (rational->int x)
     (// (numerator x) (denominator x)))
-
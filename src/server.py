@@ -0,0 +1,194 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Evaluation server. Listens on a Unix domain socket and answers one line per
+request: the client sends a program on a single line (any number of forms)
+and gets back one line of JSON,
+
+    {"value": "120", "output": "", "error": null}
+
+where 'value' is the printed value of the last form, 'output' is everything
+the program printed and 'error' is the error that stopped it, if any. Each
+program runs in a fresh environment made from the preloaded globals, in one
+of a set of worker processes that load the library once each. Connections
+are handled with asyncio, so a slow program only holds up its own
+connection, and a worker still busy after the timeout is replaced.
+"""
+
+__all__ = ['evaluate', 'serve']
+
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import signal
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+from src.batch import isolated, worker_init
+
+# Longest request line accepted
+LIMIT = 1 << 20
+
+# Programs are stopped by their time budget; the server only gives up on a
+# worker this much later
+GRACE = 1.0
+
+def evaluate(text, limits=None):
+    """Run the program in text in its own environment"""
+    from src.parsers import parse_file
+    from src.primitives import str_list
+    value, output, error = isolated(parse_file(io.StringIO(text)), limits)
+    return {
+        'value': None if error else str_list(value),
+        'output': output,
+        'error': error,
+    }
+
+def response(result):
+    return json.dumps(result).encode('utf-8') + b'\n'
+
+def failure(error):
+    return response({'value': None, 'output': '', 'error': error})
+
+def work(connection):
+    """Body of a worker process: evaluate each program sent on connection
+       and send back its result, until the server hangs up"""
+    worker_init()
+    while True:
+        try:
+            text, limits = connection.recv()
+        except EOFError:
+            return
+        try:
+            result = evaluate(text, limits)
+        except Exception as e:
+            result = {'value': None, 'output': '',
+                      'error': '{}: {}'.format(e.__class__.__name__, e)}
+        connection.send(result)
+
+class Worker(object):
+    """Process evaluating one program at a time, with the pipe to it"""
+
+    def __init__(self):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=work, args=(child,))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        # The pipe is left to be closed once unused: a thread may still be
+        # reading it, and only gets its EOFError once the process is gone
+        # Workers forked after the server set its signal handlers share them,
+        # so only SIGKILL is sure to stop one
+        self.process.kill()
+        self.process.join()
+
+class Server(object):
+    """Hands the requests of every connection to idle workers. A worker
+       that runs past the timeout is killed and replaced, so a stuck
+       program never holds up later requests."""
+
+    def __init__(self, jobs, timeout, limits=None):
+        self.timeout = timeout
+        self.limits = dict(limits or {})
+        seconds = self.limits.get('seconds')
+        self.limits['seconds'] = timeout if seconds is None else min(seconds, timeout)
+        self.workers = [Worker() for _ in range(jobs)]
+        self.idle = asyncio.Queue()
+        for worker in self.workers:
+            self.idle.put_nowait(worker)
+        # Threads waiting for the answers of workers
+        self.waiting = ThreadPoolExecutor(jobs)
+
+    async def submit(self, text):
+        """Result of evaluating text in a worker"""
+        loop = asyncio.get_running_loop()
+        worker = await self.idle.get()
+        try:
+            worker.connection.send((text, self.limits))
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.waiting, worker.connection.recv),
+                self.timeout + GRACE)
+        except asyncio.TimeoutError:
+            # Only a builtin that never returns gets here
+            worker = self.replace(worker)
+            return {'value': None, 'output': '',
+                    'error': 'TimeoutError: Gave up after {}s'.format(self.timeout)}
+        except (EOFError, OSError) as e:
+            worker = self.replace(worker)
+            return {'value': None, 'output': '',
+                    'error': 'WorkerError: Worker died ({})'.format(e.__class__.__name__)}
+        finally:
+            self.idle.put_nowait(worker)
+
+    def replace(self, worker):
+        """Kill worker and start another in its place"""
+        worker.stop()
+        self.workers.remove(worker)
+        worker = Worker()
+        self.workers.append(worker)
+        return worker
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        self.waiting.shutdown(wait=False)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(failure('RequestError: Line too long'))
+                    break
+                if not line:
+                    break
+                text = line.decode('utf-8', 'replace').strip()
+                if not text:
+                    continue
+                writer.write(response(await self.submit(text)))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled when the server stops; the connection just closes
+            pass
+        finally:
+            writer.close()
+
+async def listen(path, jobs, timeout, limits):
+    handler = Server(jobs, timeout, limits)
+    # Stop like on an interrupt when asked to terminate
+    asyncio.get_running_loop().add_signal_handler(
+        signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        # Load the library before accepting the first request
+        await handler.submit('')
+        server = await asyncio.start_unix_server(handler.handle, path, limit=LIMIT)
+        async with server:
+            await server.serve_forever()
+    finally:
+        handler.close()
+
+def remove_socket(path):
+    """Remove a socket left at path, but never any other kind of file"""
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+    except OSError:
+        pass
+
+def serve(path, jobs=None, timeout=10.0, limits=None):
+    """Serve requests on the Unix socket at path until interrupted. Each
+       program runs within the budget 'limits' and at most 'timeout'
+       seconds."""
+    remove_socket(path)
+    try:
+        asyncio.run(listen(path, jobs or os.cpu_count(), timeout, limits))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        remove_socket(path)
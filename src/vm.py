@@ -0,0 +1,725 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+"""
+Bytecode engine, chosen with 'zeta.py --engine=vm'. Expressions are compiled
+to flat code, a list of (opcode, argument) pairs, which the loop in
+'execute' runs with an explicit stack of values:
+
+    (define (inc-all ls) (map ++ ls))   =>    0 GLOBAL       MAP
+                                              1 GLOBAL       ++
+                                              2 LOCAL        1
+                                              3 TAIL_CALL    2
+
+Frames, scopes and top-level cells are the same as in eval.py, and compiled
+closures are Closures that Python code can call, so the two engines share
+the global environment and each other's functions. '(disassemble f)' prints
+the code of a compiled closure or of a quoted expression.
+
+Calls between compiled closures never nest on the Python stack, and neither
+do the calls made by map, filter and foldl: they are Stepped builtins, run
+as generators that hand each call back to the loop (see RESUME). Calls made
+from other Python code do nest: the stream builtins, Memo, analyzer
+Closures and forced promises.
+
+Most calls apply a global to locals and constants, as in (< x 0). Each of
+those is a single fused instruction that calls a builtin directly, and takes
+the JUMP_IF_FALSE after it too when there is one: CALL_L, CALL_LL, CALL_LC
+and CALL_CL for the common shapes, CALL_N for any other. If the global holds
+anything else, the instruction pushes it with its operands and goes on as a
+CALL. This keeps the loop within about 1.3x of the analyzer's closures, and
+as fast on tail calls and plain arithmetic.
+"""
+
+__all__ = ['eval', 'load', 'compile', 'disassemble', 'Code', 'Procedure']
+
+import sys
+
+from src.primitives import *
+from src.operators import Memo, Stepped
+from src.image import read_forms
+from src.eval import (declare, closure_name, reject, wrong_arity, monitors,
+                      require)
+
+# Opcodes, roughly from most to least frequently run
+OPCODES = (
+    LOCAL, CONST, GLOBAL, CALL, TAIL_CALL, RETURN, JUMP_IF_FALSE, JUMP, OUTER,
+    CHECKED, POP, SET_LOCAL, JUMP_IF_TRUE, CLOSURE, ENTER, LEAVE,
+    DEFINE_LOCAL, DEFINE_GLOBAL, DELETE_LOCAL, DELETE_GLOBAL, MEMO, PROMISE,
+    STREAM, LOAD, REQUIRE, EVAL, RESUME, CALL_L, CALL_LL, CALL_LC, CALL_CL,
+    CALL_N,
+) = tuple(range(32))
+
+NAMES = (
+    'LOCAL', 'CONST', 'GLOBAL', 'CALL', 'TAIL_CALL', 'RETURN', 'JUMP_IF_FALSE',
+    'JUMP', 'OUTER', 'CHECKED', 'POP', 'SET_LOCAL', 'JUMP_IF_TRUE', 'CLOSURE',
+    'ENTER', 'LEAVE', 'DEFINE_LOCAL', 'DEFINE_GLOBAL', 'DELETE_LOCAL',
+    'DELETE_GLOBAL', 'MEMO', 'PROMISE', 'STREAM', 'LOAD', 'REQUIRE',
+    'EVAL', 'RESUME', 'CALL_L', 'CALL_LL', 'CALL_LC', 'CALL_CL', 'CALL_N',
+)
+
+# Code run in place of a Stepped builtin, whose generator is in the frame
+# register: each RESUME sends it the value of its last call
+RESUMING = ((RESUME, None),)
+
+class Code(object):
+    """Compiled body of a closure, or of a top-level expression. 'locals'
+       pads frames with a slot for every name the body defines."""
+    __slots__ = ('ops', 'name', 'formals', 'locals')
+
+    def __init__(self, ops, name, formals=(), locals=()):
+        self.ops = ops
+        self.name = name
+        self.formals = formals
+        self.locals = locals
+
+    def __repr__(self):
+        return '<CODE {}>'.format(self.name)
+
+class Procedure(Closure):
+    """Closure whose body is compiled code. Python code, such as builtins
+       taking functions, calls it like any other function."""
+    arity_error = Exception, "Wrong number of actual parameters"
+
+    def __init__(self, code, env):
+        Closure.__init__(self, None, code.formals, env, code.locals, code.name)
+        self.code = code
+
+    def __call__(self, *args):
+        if len(args) != self.arity:
+            wrong_arity()
+        frame = [self.env]
+        frame.extend(args)
+        if self.locals:
+            frame.extend(self.locals)
+        if not monitors:
+            return execute(self.code.ops, frame, ())
+        return call(self, frame)
+
+# Functions that fused calls (CALL_L to CALL_N) leave to CALL
+CALLED = frozenset((Procedure, Closure, Stepped))
+
+def unbound(name):
+    raise NameError("No binding for name '{}' in scope".format(name))
+
+def call(function, frame):
+    """Run a procedure in its new frame, telling any monitors about it the
+       way eval.monitored_run does"""
+    if not monitors:
+        return execute(function.code.ops, frame, ())
+    watching = enter(function)
+    try:
+        return execute(function.code.ops, frame, watching)
+    finally:
+        for watcher in watching:
+            watcher.leave()
+
+def enter(function):
+    """Tell the monitors about a call and return those that accepted it"""
+    watching, called = tuple(monitors), 0
+    try:
+        for watcher in watching:
+            watcher.call(function)
+            called += 1
+    except BaseException:
+        # A monitor may refuse the call; only those told about it are told
+        # when it ends
+        for watcher in watching[:called]:
+            watcher.leave()
+        raise
+    return watching
+
+def execute(ops, frame, watching):
+    """Run code in frame and return its value. Tail calls to procedures
+       replace the code and frame being run. Other calls to procedures save
+       where to return to on a list of continuations rather than the Python
+       stack, so recursion is only limited by memory. 'watching' are the
+       monitors that were told about the call being run."""
+    stack = []
+    push, pop = stack.append, stack.pop
+    # Code, position, frame and monitors of each caller waiting for a value
+    continuations = []
+    pc = 0
+    try:
+        while 1:
+            op, arg = ops[pc]
+            pc += 1
+            if op >= CALL_L:
+                # A global applied to locals or a constant. Builtins are
+                # called here, anything else goes through CALL below.
+                cell, x, y, tail, branch = arg
+                function = cell.value
+                if op == CALL_N:
+                    # Any other number or mix of locals and constants
+                    x = [frame[y] if local else y for local, y in x]
+                    count = len(x)
+                elif op == CALL_CL:
+                    y = frame[y]
+                    count = 2
+                else:
+                    x = frame[x]
+                    if op == CALL_LL:
+                        y = frame[y]
+                    count = 1 if op == CALL_L else 2
+                if type(function) in CALLED:
+                    push(function)
+                    if op == CALL_N:
+                        stack.extend(x)
+                    else:
+                        push(x)
+                        if count == 2:
+                            push(y)
+                    op, arg = TAIL_CALL if tail else CALL, count
+                else:
+                    try:
+                        if op == CALL_N:
+                            value = function(*x)
+                        else:
+                            value = function(x) if count == 1 else function(x, y)
+                    except TypeError:
+                        if function is UNBOUND:
+                            unbound(cell.name)
+                        reject(function, count)
+                        raise
+                    if branch is not None:
+                        # Take the JUMP_IF_FALSE that follows here
+                        pc = pc + 1 if value else branch
+                        continue
+                    elif not tail:
+                        push(value)
+                        continue
+                    if not continuations:
+                        return value
+                    if watching:
+                        for watcher in watching:
+                            watcher.leave()
+                    ops, pc, frame, watching = continuations.pop()
+                    push(value)
+                    continue
+            if op == LOCAL:
+                push(frame[arg])
+            elif op == CONST:
+                push(arg)
+            elif op == GLOBAL:
+                value = arg.value
+                if value is UNBOUND:
+                    unbound(arg.name)
+                push(value)
+            elif op == CALL or op == TAIL_CALL:
+                function = stack[-arg - 1]
+                kind = type(function)
+                if kind is Procedure:
+                    if function.arity != arg:
+                        wrong_arity()
+                    new = [function.env]
+                    if arg:
+                        new.extend(stack[-arg:])
+                    del stack[-arg - 1:]
+                    if function.locals:
+                        new.extend(function.locals)
+                    if op == CALL:
+                        # Told first: a monitor refusing the call leaves the
+                        # caller's watchers in place for the unwinding below
+                        called = enter(function) if monitors else ()
+                        continuations.append((ops, pc, frame, watching))
+                        watching = called
+                    elif watching:
+                        for watcher in watching:
+                            watcher.bounce(function)
+                    ops, frame, pc = function.code.ops, new, 0
+                    continue
+                if kind is Stepped and arg and type(stack[-arg]) is Procedure:
+                    # Run the builtin a call at a time, so the calls it
+                    # makes to the procedure go on the continuations too
+                    args = stack[-arg:]
+                    del stack[-arg - 1:]
+                    try:
+                        steps = function.steps(*args)
+                    except TypeError:
+                        reject(function, arg)
+                        raise
+                    if op == CALL:
+                        continuations.append((ops, pc, frame, watching))
+                        watching = ()
+                    ops, pc, frame = RESUMING, 0, steps
+                    push(None)
+                    continue
+                if kind is Closure:
+                    from src.eval import apply
+                    args = stack[-arg:] if arg else ()
+                    del stack[-arg - 1:]
+                    push(apply(function, args))
+                else:
+                    # The result takes the place of the function
+                    try:
+                        if arg == 2:
+                            y = pop()
+                            stack[-1] = function(pop(), y)
+                        elif arg == 1:
+                            x = pop()
+                            stack[-1] = function(x)
+                        elif arg:
+                            args = stack[-arg:]
+                            del stack[-arg:]
+                            stack[-1] = function(*args)
+                        else:
+                            stack[-1] = function()
+                    except TypeError:
+                        reject(function, arg)
+                        raise
+                if op == TAIL_CALL:
+                    if not continuations:
+                        return pop()
+                    for watcher in watching:
+                        watcher.leave()
+                    ops, pc, frame, watching = continuations.pop()
+            elif op == RETURN:
+                if not continuations:
+                    return pop()
+                # The value stays on the stack for the caller
+                if watching:
+                    for watcher in watching:
+                        watcher.leave()
+                ops, pc, frame, watching = continuations.pop()
+            elif op == RESUME:
+                try:
+                    function, args = frame.send(pop())
+                except StopIteration as done:
+                    if not continuations:
+                        return done.value
+                    for watcher in watching:
+                        watcher.leave()
+                    ops, pc, frame, watching = continuations.pop()
+                    push(done.value)
+                    continue
+                if type(function) is Procedure:
+                    if function.arity != len(args):
+                        wrong_arity()
+                    new = [function.env, *args]
+                    if function.locals:
+                        new.extend(function.locals)
+                    called = enter(function) if monitors else ()
+                    continuations.append((ops, 0, frame, watching))
+                    watching = called
+                    ops, frame, pc = function.code.ops, new, 0
+                else:
+                    from src.eval import apply
+                    push(apply(function, args))
+                    pc = 0
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == OUTER:
+                depth, index = arg
+                env = frame
+                for _ in range(depth):
+                    env = env[0]
+                push(env[index])
+            elif op == CHECKED:
+                depth, index, name = arg
+                env = frame
+                for _ in range(depth):
+                    env = env[0]
+                value = env[index]
+                if value is UNBOUND:
+                    unbound(name)
+                push(value)
+            elif op == POP:
+                pop()
+            elif op == SET_LOCAL:
+                frame[arg] = pop()
+            elif op == JUMP_IF_TRUE:
+                if pop():
+                    pc = arg
+            elif op == CLOSURE:
+                push(Procedure(arg, frame))
+            elif op == ENTER:
+                frame = [frame]
+                frame.extend(arg)
+            elif op == LEAVE:
+                frame = frame[0]
+            elif op == DEFINE_LOCAL:
+                frame[arg] = pop()
+                push(NIL)
+            elif op == DEFINE_GLOBAL:
+                arg.value = pop()
+                push(NIL)
+            elif op == DELETE_LOCAL:
+                depth, index = arg
+                env = frame
+                for _ in range(depth):
+                    env = env[0]
+                env[index] = UNBOUND
+                push(NIL)
+            elif op == DELETE_GLOBAL:
+                root, name = arg
+                root.pop(name)
+                push(NIL)
+            elif op == MEMO:
+                push(Memo(pop()))
+            elif op == PROMISE:
+                push(Promise(delayed(arg, frame)))
+            elif op == STREAM:
+                push(Pair(pop(), Promise(delayed(arg, frame))))
+            elif op == LOAD:
+                path, root = arg
+                push(load(path, root))
+            elif op == REQUIRE:
+                path, root = arg
+                push(require(path, root, load))
+            elif op == EVAL:
+                push(eval(to_tuple(pop()), arg))
+            else:
+                raise Exception('Bad opcode {}'.format(op))
+    except BaseException:
+        # Callers waiting on the continuations are left as the exception
+        # passes through them; 'call' leaves the outermost one
+        while continuations:
+            for watcher in watching:
+                watcher.leave()
+            watching = continuations.pop()[3]
+        raise
+
+def delayed(code, frame):
+    """Thunk running code in frame when a promise is forced"""
+    return lambda: execute(code.ops, frame, ())
+
+class Compiler(object):
+    """Compiles expressions into one flat list of code"""
+
+    def __init__(self):
+        self.ops = []
+
+    def emit(self, op, arg=None):
+        """Add an instruction and return its position"""
+        self.ops.append((op, arg))
+        return len(self.ops) - 1
+
+    def here(self):
+        return len(self.ops)
+
+    def patch(self, position, arg):
+        op = self.ops[position][0]
+        self.ops[position] = op, arg
+        if op == JUMP_IF_FALSE and position and self.ops[position - 1][0] >= CALL_L:
+            # A fused call of a builtin can take the jump by itself
+            fused, (cell, x, y, tail, _) = self.ops[position - 1]
+            if not tail:
+                self.ops[position - 1] = fused, (cell, x, y, tail, arg)
+
+    def finish(self, tail):
+        if tail:
+            self.emit(RETURN)
+
+    def expr(self, expr, scope, tail):
+        """Compile expr in scope; in tail position the code returns"""
+        if isinstance(expr, Symbol):
+            self.variable(expr, scope)
+            self.finish(tail)
+            return
+        elif isnil(expr) or not isinstance(expr, tuple):
+            self.emit(CONST, expr)
+            self.finish(tail)
+            return
+        first, rest = splits(expr)
+        form = FORMS.get(first)
+        if form is not None:
+            form(self, rest, scope, tail)
+        else:
+            self.application(expr, scope, tail)
+
+    def sequence(self, exprs, scope, tail):
+        if not exprs:
+            self.emit(CONST, NIL)
+            self.finish(tail)
+            return
+        for expr in exprs[:-1]:
+            self.expr(expr, scope, False)
+            self.emit(POP)
+        self.expr(exprs[-1], scope, tail)
+
+    def variable(self, name, scope):
+        address = scope.lookup(name)
+        if address is None:
+            self.emit(GLOBAL, toplevel(scope).cell(name))
+            return
+        depth, index, owner = address
+        if name in owner.defines:
+            self.emit(CHECKED, (depth, index, name))
+        elif depth == 0:
+            self.emit(LOCAL, index)
+        else:
+            self.emit(OUTER, (depth, index))
+
+    def application(self, expr, scope, tail):
+        if isinstance(expr[0], Symbol) and scope.lookup(expr[0]) is None:
+            operands = tuple(self.operand(x, scope) for x in expr[1:])
+            kinds = tuple(kind for kind, _ in operands)
+            if None not in kinds:
+                cell = toplevel(scope).cell(expr[0])
+                values = tuple(value for _, value in operands)
+                fused = FUSED.get(kinds)
+                if fused is not None:
+                    self.emit(fused, (cell, values[0], values[-1], tail, None))
+                else:
+                    operands = tuple((kind == 'local', value)
+                                     for kind, value in operands)
+                    self.emit(CALL_N, (cell, operands, None, tail, None))
+                return
+        for item in expr:
+            self.expr(item, scope, False)
+        self.emit(TAIL_CALL if tail else CALL, len(expr) - 1)
+
+    def operand(self, expr, scope):
+        """('local', index) for a variable of the frame that is always
+           bound, ('const', value) for a literal, or (None, None)"""
+        if isinstance(expr, Symbol):
+            address = scope.lookup(expr)
+            if address is not None:
+                depth, index, owner = address
+                if depth == 0 and expr not in owner.defines:
+                    return 'local', index
+        elif isnil(expr) or not isinstance(expr, tuple):
+            return 'const', expr
+        return None, None
+
+    def closure(self, formals, body, scope, name=None):
+        """Emit code making a closure"""
+        local = Scope(formals, scope, 'lambda' if name is None else str(name))
+        declare(body, local)
+        compiler = Compiler()
+        compiler.sequence(body, local, True)
+        locals = (UNBOUND,) * (len(local.names) - len(formals))
+        self.emit(CLOSURE, Code(compiler.ops, closure_name(local), formals, locals))
+
+    def definition(self, name, scope):
+        """Emit code binding name to the value on the stack"""
+        if isinstance(scope, Scope):
+            self.emit(DEFINE_LOCAL, scope.add(name))
+        else:
+            self.emit(DEFINE_GLOBAL, scope.cell(name))
+
+    def delayed(self, expr, scope):
+        """Code evaluating expr in the frame of the code around it"""
+        compiler = Compiler()
+        compiler.expr(expr, scope, False)
+        compiler.emit(RETURN)
+        return Code(compiler.ops, 'delay')
+
+    # Special forms, see the analyzers of the same names in eval.py
+
+    def let(self, body, scope, tail):
+        local = Scope((), scope)
+        enter = self.emit(ENTER, ())
+        for name, expr in car(body):
+            self.expr(expr, local, False)
+            self.emit(SET_LOCAL, local.add(name))
+        declare(cdr(body), local)
+        self.sequence(cdr(body), local, tail)
+        self.patch(enter, (UNBOUND,) * len(local.names))
+        if not tail:
+            self.emit(LEAVE)
+
+    def lambda_(self, function, scope, tail):
+        self.closure(car(function), cdr(function), scope)
+        self.finish(tail)
+
+    def quote(self, ls, scope, tail):
+        self.emit(CONST, to_list(car(ls)))
+        self.finish(tail)
+
+    def begin(self, exprs, scope, tail):
+        self.sequence(exprs, scope, tail)
+
+    def if_(self, exprs, scope, tail):
+        if len(exprs) != 3:
+            raise Exception('Malformed if: "{}"'.format(exprs))
+        self.expr(exprs[0], scope, False)
+        otherwise = self.emit(JUMP_IF_FALSE)
+        self.expr(exprs[1], scope, tail)
+        if not tail:
+            end = self.emit(JUMP)
+        self.patch(otherwise, self.here())
+        self.expr(exprs[2], scope, tail)
+        if not tail:
+            self.patch(end, self.here())
+
+    def cond(self, exprs, scope, tail):
+        ends = []
+        for test, expr in exprs:
+            self.expr(test, scope, False)
+            otherwise = self.emit(JUMP_IF_FALSE)
+            self.expr(expr, scope, tail)
+            if not tail:
+                ends.append(self.emit(JUMP))
+            self.patch(otherwise, self.here())
+        self.emit(CONST, NIL)
+        self.finish(tail)
+        for end in ends:
+            self.patch(end, self.here())
+
+    def or_(self, exprs, scope, tail):
+        self.short_circuit(exprs, scope, tail, JUMP_IF_TRUE, True)
+
+    def and_(self, exprs, scope, tail):
+        self.short_circuit(exprs, scope, tail, JUMP_IF_FALSE, False)
+
+    def short_circuit(self, exprs, scope, tail, jump, decided):
+        """Jump to push 'decided' as soon as an expression decides the
+           outcome, or push the opposite"""
+        exits = []
+        for expr in exprs:
+            self.expr(expr, scope, False)
+            exits.append(self.emit(jump))
+        self.emit(CONST, not decided)
+        end = self.emit(JUMP)
+        for position in exits:
+            self.patch(position, self.here())
+        self.emit(CONST, decided)
+        self.patch(end, self.here())
+        self.finish(tail)
+
+    def define(self, expr, scope, tail):
+        if isatom(car(expr)):
+            name = car(expr)
+            self.expr(car(cdr(expr)), scope, False)
+        else:
+            name = car(car(expr))
+            self.closure(cdr(car(expr)), cdr(expr), scope, name)
+        self.definition(name, scope)
+        self.finish(tail)
+
+    def define_memo(self, expr, scope, tail):
+        if isatom(car(expr)):
+            raise Exception('Malformed define-memo: "{}"'.format(expr))
+        name = car(car(expr))
+        self.closure(cdr(car(expr)), cdr(expr), scope, name)
+        self.emit(MEMO)
+        self.definition(name, scope)
+        self.finish(tail)
+
+    def delete(self, expr, scope, tail):
+        name = car(expr)
+        if not isatom(name):
+            self.emit(CONST, NIL)
+        else:
+            address = scope.lookup(name)
+            if address is None:
+                self.emit(DELETE_GLOBAL, (toplevel(scope), name))
+            else:
+                depth, index, owner = address
+                owner.defines.add(name)
+                self.emit(DELETE_LOCAL, (depth, index))
+        self.finish(tail)
+
+    def load(self, s, scope, tail):
+        self.emit(LOAD, (car(s), toplevel(scope)))
+        self.finish(tail)
+
+    def eval(self, s, scope, tail):
+        if len(s) != 1:
+            raise Exception('Malformed eval: "{}"'.format(s))
+        self.expr(car(s), scope, False)
+        self.emit(EVAL, toplevel(scope))
+        self.finish(tail)
+
+    def require(self, s, scope, tail):
+        self.emit(REQUIRE, (car(s), toplevel(scope)))
+        self.finish(tail)
+
+    def delay(self, exprs, scope, tail):
+        self.emit(PROMISE, self.delayed(car(exprs), scope))
+        self.finish(tail)
+
+    def cons_stream(self, exprs, scope, tail):
+        if len(exprs) != 2:
+            raise Exception('Malformed cons-stream: "{}"'.format(exprs))
+        self.expr(exprs[0], scope, False)
+        self.emit(STREAM, self.delayed(exprs[1], scope))
+        self.finish(tail)
+
+# Fused calls of a global by the kinds of their operands
+FUSED = {
+    ('local',): CALL_L,
+    ('local', 'local'): CALL_LL,
+    ('local', 'const'): CALL_LC,
+    ('const', 'local'): CALL_CL,
+}
+
+FORMS = {Symbol(name): method for name, method in (
+    ('let', Compiler.let),
+    ('lambda', Compiler.lambda_),
+    ('quote', Compiler.quote),
+    ('begin', Compiler.begin),
+    ('if', Compiler.if_),
+    ('cond', Compiler.cond),
+    ('or', Compiler.or_),
+    ('and', Compiler.and_),
+    ('define', Compiler.define),
+    ('define-memo', Compiler.define_memo),
+    ('delete', Compiler.delete),
+    ('load', Compiler.load),
+    ('require', Compiler.require),
+    ('eval', Compiler.eval),
+    ('delay', Compiler.delay),
+    ('cons-stream', Compiler.cons_stream),
+)}
+
+def compile(expr, env):
+    """Compile a top-level expression in environment env"""
+    compiler = Compiler()
+    compiler.expr(expr, env, False)
+    compiler.emit(RETURN)
+    return Code(compiler.ops, 'top-level')
+
+def eval(expr, env):
+    """Evaluate s-expression parsed into tuples in top-level environment env"""
+    return execute(compile(expr, env).ops, env, ())
+
+def load(path, env):
+    """Evaluate each expression in the file at path and return the last value"""
+    value = NIL
+    for expression in read_forms(path):
+        value = eval(expression, env)
+    return value
+
+def disassemble(code, stream=None):
+    """Print code and the code of every closure or promise made by it"""
+    stream = sys.stdout if stream is None else stream
+    pending = [code]
+    while pending:
+        code = pending.pop(0)
+        stream.write('{} ({} args)\n'.format(code.name, len(code.formals)))
+        for pc, (op, arg) in enumerate(code.ops):
+            if isinstance(arg, Code):
+                pending.append(arg)
+                shown = arg.name
+            elif isinstance(arg, Cell):
+                shown = arg.name
+            elif op == EVAL:
+                shown = ''
+            elif op in (DELETE_GLOBAL, LOAD, REQUIRE):
+                shown = str_list(arg[1] if op == DELETE_GLOBAL else arg[0])
+            elif op == ENTER:
+                shown = len(arg)
+            elif op == CONST:
+                shown = str_list(arg)
+            elif op >= CALL_L:
+                cell, x, y, tail, branch = arg
+                if op == CALL_N:
+                    operands = tuple(y if local else str_list(y)
+                                     for local, y in x)
+                else:
+                    operands = {CALL_L: (x,), CALL_LL: (x, y),
+                                CALL_LC: (x, str_list(y)),
+                                CALL_CL: (str_list(x), y)}[op]
+                shown = ' '.join(str(item) for item in (cell.name,) + operands)
+                if tail:
+                    shown += ' (tail)'
+                elif branch is not None:
+                    shown += ' (else {})'.format(branch)
+            else:
+                shown = '' if arg is None else arg
+            stream.write('{:6} {:<14}{}\n'.format(pc, NAMES[op], shown).rstrip() + '\n')
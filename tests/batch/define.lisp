@@ -0,0 +1,4 @@
+;; Definitions stay in this script's environment
+(define secret 42)
+(define (square x) (* x x))
+(print (square secret))
@@ -0,0 +1,3 @@
+;; Definitions made through eval stay in this script's environment too
+(eval '(define leak 42))
+(print leak)
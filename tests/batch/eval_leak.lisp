@@ -0,0 +1,3 @@
+;; Runs after eval_define.lisp in the same worker with --jobs 1
+(print (eval ''leak))
+(print leak)
@@ -0,0 +1,3 @@
+;; Definitions made by eval passed as a value stay in this script too
+(map eval '((define mapped 42)))
+(print mapped)
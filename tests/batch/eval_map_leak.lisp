@@ -0,0 +1,2 @@
+;; Runs after eval_map.lisp in the same worker with --jobs 1
+(print mapped)
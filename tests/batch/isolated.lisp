@@ -0,0 +1,3 @@
+;; Library functions are preloaded, but nothing from other scripts is
+(print (product (range 1 5)))
+(print secret)
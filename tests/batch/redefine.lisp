@@ -0,0 +1,3 @@
+;; Redefining a global only affects this script
+(define (reverse ls) 'mine)
+(print (reverse '(1 2 3)))
@@ -0,0 +1,13 @@
+;; Run with --max-steps 1000: short loops finish, an endless one is stopped
+(define (count-down n)
+    (if (= n 0)
+        'done
+        (count-down (- n 1))))
+(print (count-down 100))
+
+;; Builtins count a step for every 1024 elements they go through
+(print (length (range 1 100000)))
+
+(define (forever) (forever))
+(forever)
+(print 'unreachable)
@@ -0,0 +1,36 @@
+;; Non-tail recursion far deeper than the Python stack, run with --engine=vm
+
+(define (count n)
+    (if (= n 0) 0 (+ 1 (count (- n 1)))))
+(print (count 100000))
+
+;; Building and walking a long list without accumulators
+(define (build n)
+    (if (= n 0) '() (cons n (build (- n 1)))))
+(define (total ls)
+    (if (null? ls) 0 (+ (car ls) (total (cdr ls)))))
+(print (total (build 100000)))
+
+;; A tree nested thousands of levels deep
+(define (nest n)
+    (cond [(= n 0) 'leaf]
+          [#t (list (nest (- n 1)) n)]))
+(define (depth tree)
+    (if (atom? tree) 0 (+ 1 (depth (car tree)))))
+(print (depth (nest 50000)))
+
+;; Recursion through map, filter and foldl, which call back into the vm
+(define (tree-depth t) (if (atom? t) 0 (++ (max (map tree-depth t)))))
+(print (tree-depth (nest 3000)))
+(define (leaves t)
+    (if (atom? t) 1 (foldl + 0 (map leaves (filter (lambda (x) (not (null? x))) t)))))
+(print (leaves (nest 3000)))
+
+;; Mutual recursion in both tail and non-tail position
+(define (ping n) (if (= n 0) 0 (+ 1 (pong (- n 1)))))
+(define (pong n) (if (= n 0) 0 (ping (- n 1))))
+(print (ping 100001))
+
+;; An error deep inside unwinds to the top level
+(define (explode n) (if (= n 0) (car 1) (+ 1 (explode (- n 1)))))
+(explode 50000)
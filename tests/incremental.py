@@ -0,0 +1,87 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+'''
+Feeds the incremental Reader text in awkward chunks and prints what each
+call returns. Compare with tests/incremental.out.
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsers.reader import Reader
+from src.parsers.utils import ParseError
+from src.primitives import str_list
+
+def show(label, forms):
+    print('{}: {}'.format(label, ' '.join(str_list(form) for form in forms)))
+
+def feed(reader, *chunks):
+    """Feed each chunk, printing the forms it completed and what is
+       pending after it"""
+    for chunk in chunks:
+        try:
+            forms = reader.feed(chunk)
+        except ParseError as e:
+            print('{!r} -> {}: {}'.format(chunk, e.__class__.__name__, e))
+            continue
+        print('{!r} -> [{}] pending={} depth={}'.format(
+            chunk, ' '.join(str_list(form) for form in forms),
+            reader.pending(), len(reader.stack)))
+
+def close(reader):
+    try:
+        show('close', reader.close())
+    except ParseError as e:
+        print('close -> {}: {}'.format(e.__class__.__name__, e))
+    print('after close pending={}'.format(reader.pending()))
+
+def main():
+    print('# A form split across chunks, even inside an atom')
+    reader = Reader()
+    feed(reader, '(define (sq', 'uare x)\n', '  (* x x))', '\n')
+    close(reader)
+
+    print('# A string split in the middle')
+    reader = Reader()
+    feed(reader, '(print "hello ', 'world")\n')
+    close(reader)
+
+    print('# Several forms in one chunk, the last left open')
+    reader = Reader()
+    feed(reader, '1 2 (a [b\n', '{c}] d)\n')
+    close(reader)
+
+    print('# Pending depth grows and shrinks with the brackets')
+    reader = Reader()
+    feed(reader, '(a\n', '(b\n', '(c\n', ')\n', '))\n')
+    close(reader)
+
+    print('# Input without a final newline is read by close')
+    reader = Reader()
+    feed(reader, '(+ 1 2) 42')
+    close(reader)
+
+    print('# Unterminated forms at close')
+    reader = Reader()
+    feed(reader, '(a (b\n')
+    close(reader)
+    feed(reader, "'\n")
+    close(reader)
+
+    print('# A reader that raised starts afresh')
+    reader = Reader()
+    feed(reader, '(a\n', ']\n', '(b)\n')
+    close(reader)
+
+    print('# reset drops partial input')
+    reader = Reader()
+    feed(reader, '(a b\n')
+    reader.reset()
+    feed(reader, 'c\n')
+    close(reader)
+
+if __name__ == '__main__':
+    main()
@@ -34,5 +34,10 @@
 (test "19. max 1..5" (max ls) 5)
 (test "20. min 1..5" (min ls) 1)
 (test "21. gcd 100 8" (gcd 100 8) 4)
+(test "22. sum 1..10000" (sum (range 1 10000)) 50005000)
+(test "23. map/filter/length 1..10000"
+    (length (filter even (map square (range 1 10000)))) 5000)
+(test "24. foldl closure 1..1000" (foldl (lambda (acc x) (+ acc x)) 0 (range 1 1000)) 500500)
+(test "25. take 3 drop 2 1..5" (take 3 (drop 2 ls)) '(3 4 5))
 
 (print "Library tests completed")
@@ -0,0 +1,4 @@
+;; Run the library tests against the lisp definitions of the list functions
+;; instead of the builtins. The output must match library.out.
+(load "src/lists.lisp")
+(load "tests/library.lisp")
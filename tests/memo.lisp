@@ -0,0 +1,41 @@
+;; Memoized functions cache their results by argument
+
+(define-memo (fib n)
+    (if (< n 2)
+        n
+        (+ (fib (- n 1)) (fib (- n 2)))))
+
+;; Each value is computed once, so this is quick
+(print (fib 80))
+(print (memo-stats fib))
+
+;; Calling again only hits the cache
+(print (fib 80))
+(print (memo-stats fib))
+
+(memo-clear fib)
+(print (memo-stats fib))
+
+;; A small cache forgets the least recently used results
+(define square (memoize (lambda (x) (* x x)) 2))
+(print (square 2) (square 3) (square 2) (square 4) (square 3))
+(print (memo-stats square))
+
+;; Lists and rationals work as keys
+(define-memo (total ls) (sum ls))
+(print (total '(1 2 3)) (total (list 1 2 3)) (total '(1/2 1/3)))
+(print (memo-stats total))
+
+;; Arguments of different types are never confused, even when equal
+(define-memo (kind x) (list x (symbol? x) (string? x)))
+(print (kind 1) (kind 1.0) (kind #t))
+(print (kind 'abc) (kind "ABC") (kind '(1)) (kind '(1.0)))
+(print (memo-stats kind))
+
+;; Streams are not keyed by the part of them forced so far
+(define-memo (forced s) (stream->list s))
+(print (forced (stream-range 1 3)) (forced (stream-range 1 5)))
+(print (memo-stats forced))
+
+;; Memoized functions check their arguments like closures
+(fib 1 2)
@@ -0,0 +1,4 @@
+;; Module for tests/require.lisp. Prints each time it is evaluated.
+(require "tests/modules/names.lisp")
+(print "loading greeting")
+(define (greet who) (print "hello" who))
@@ -0,0 +1,4 @@
+;; Module for tests/require.lisp, requiring the module that requires it
+(require "tests/modules/greeting.lisp")
+(print "loading names")
+(define names '(ada alan grace))
@@ -0,0 +1,79 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+'''
+Runs programs on both engines with a depth budget and a second monitor that
+counts nesting, and prints the count left after each run. Every call a
+monitor was told about must be left again, even when the budget stops the
+program, so each count ends at 0. Compare with tests/monitors.out.
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.budget import Budget, BudgetExceeded
+from src.eval import boot, monitor, unmonitor, select_engine
+from src.operators import global_env
+from src.parsers import parse_file
+from src.primitives import Environment
+
+PROGRAM = '''
+(define (count n) (if (= n 0) 0 (+ 1 (count (- n 1)))))
+(define (fail n) (if (= n 0) (car 1) (+ 1 (fail (- n 1)))))
+(define (through-map n) (if (= n 0) 0 (+ 1 (car (map through-map (list (- n 1)))))))
+(define (tail-fold n) (if (= n 0) 0 (foldl (lambda (acc x) (+ 1 (tail-fold x))) 0 (list (- n 1)))))
+(define (fail-in-map n) (if (= n 0) (car 1) (car (map fail-in-map (list (- n 1))))))
+'''
+
+class Level(object):
+    """Monitor keeping the nesting of calls it was told about"""
+
+    def __init__(self):
+        self.level = 0
+
+    def call(self, function):
+        self.level += 1
+
+    def bounce(self, function):
+        pass
+
+    def leave(self):
+        self.level -= 1
+
+    def tick(self):
+        pass
+
+def run(engine, expression, depth):
+    eval = select_engine(engine)[0]
+    env = Environment(scope=global_env)
+    forms = list(parse_file(iter((PROGRAM + expression).splitlines(True))))
+    level = Level()
+    monitor(level)
+    try:
+        with Budget(depth=depth):
+            for form in forms:
+                value = eval(form, env)
+        outcome = value
+    except BudgetExceeded as e:
+        outcome = e.limit
+    except Exception as e:
+        outcome = e.__class__.__name__
+    finally:
+        unmonitor(level)
+    print(engine, expression, outcome, level.level)
+
+def main():
+    boot()
+    for engine in ('eval', 'vm'):
+        run(engine, '(count 10)', 100)
+        run(engine, '(count 200)', 100)
+        run(engine, '(fail 10)', 100)
+        run(engine, '(through-map 10)', 100)
+        run(engine, '(through-map 200)', 100)
+        run(engine, '(tail-fold 10)', 100)
+        run(engine, '(fail-in-map 10)', 100)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+;; Run with and without --optimize; the output must be the same
+
+;; Constant expressions
+(define (area r) (* r r (/ 22 7)))
+(print (area 2) (+ 1 2 3) (++ 1) (not #t) (rational 6 4))
+(print (if (< 1 2) 'yes 'no) (cond ((= 1 2) 'a) (#t 'b) (#t 'c)))
+(print (cond ((> 1 2) 'never)))
+(print (cadr '(1 2 3)) (caddr '(1 2 3)) (cddr '(1 2 3)))
+
+;; Names the program rebinds are left alone, even before they are rebound
+(define (twice x) (++ x))
+(print (twice 5) (caar '((1) 2)))
+(define (++ x) (* 2 x))
+(define (caar x) 'mine)
+(print (twice 5) (caar '((1) 2)))
+
+;; So are names bound by a lambda
+(define (shadow mod) (mod 7 2))
+(print (shadow +) (mod 7 2))
+
+;; Errors still happen when the expression runs
+(print "before")
+(/ 1 0)
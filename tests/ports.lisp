@@ -0,0 +1,50 @@
+;; Ports, run with tests/ports.txt on stdin
+
+;; Reading stdin one datum at a time
+(define (sum-years total)
+    (let [(record (read-datum))]
+        (if (eof-object? record)
+            total
+            (begin
+                (write-datum record)
+                (sum-years (+ total (car (cdr (cdr record)))))))))
+(print (sum-years 0))
+(print (eof-object? (read)) (eof-object? (read-line)))
+
+;; Writing a file through the current output, then reading it back by lines
+(define path "tests/ports.tmp")
+(with-output-to-file path
+    (lambda ()
+        (print "first line")
+        (write-datum '(1 "two" 3.0 #t nil))
+        (write-line 'done)))
+(define in (open-input-file path))
+(print (port? in) (read-line in) (read-line in))
+(print (read-datum in) (eof-object? (read-datum in)))
+(close-port in)
+
+;; Explicit output ports
+(define out (open-output-file path))
+(write-datum (* 1.0 100000000000000000000) out)
+(write-line "plain text" out)
+(close-port out)
+(define in (open-input-file path))
+(print (read-datum in) (read-line in) (eof-object? (read-line in)))
+(close-port in)
+
+;; Reading lines after data takes up the rest of the datum's line first
+(define out (open-output-file path))
+(write-line "1 2 ; comment" out)
+(write-line "hello" out)
+(write-line "(3" out)
+(write-line " 4) 5 (6" out)
+(write-line "7)" out)
+(close-port out)
+(define in (open-input-file path))
+(print (read-datum in) (read-line in) (read-datum in) (read-datum in))
+(print (read-datum in) (read-line in) (read-line in))
+(print (eof-object? (read-datum in)))
+(close-port in)
+
+;; Data that cannot be read back is not written
+(write-datum (lambda (x) x))
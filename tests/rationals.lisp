@@ -0,0 +1,44 @@
+;; Compare evaluated expression to expected
+(define (test name expression expected)
+	(print name "->" expression)
+	(if (= expression expected)
+		nil
+		(print "FAILED!")))
+
+(define half (rational 1 2))
+(define third 1/3)
+
+(test "1. reader" -6/8 (rational -3 4))
+(test "2. lowest terms" (rational 10 -4) -5/2)
+(test "3. +" (+ half third) 5/6)
+(test "4. -" (- half third 1) -5/6)
+(test "5. *" (* half third 6) 1)
+(test "6. / rationals" (/ half third) 3/2)
+(test "7. mixed with int" (+ half 1) 3/2)
+(test "8. mixed with float" (+ half 0.25) 0.75)
+(test "9. <" (< third half) #t)
+(test "10. numerator" (numerator 6/8) 3)
+(test "11. denominator" (denominator 6/8) 4)
+(test "12. rational?" (list (rational? half) (rational? 2) (rational? 0.5)) '(#t #t #f))
+(test "13. number?" (number? half) #t)
+(test "14. sum of list" (sum (list 1/2 1/3 1/6)) 1)
+
+;; The old list-free API still works
+(test "15. rational+" (rational+ half third) 5/6)
+(test "16. rational/" (rational/ half third) 3/2)
+(test "17. rational<=" (rational<= half half) #t)
+(test "18. rational->float" (rational->float 3/4) 0.75)
+(test "19. rational->int" (rational->int 7/2) 3)
+
+;; Whole results are integers
+(test "20. integer sum" (integer? (+ 1/2 1/2)) #t)
+(test "21. integer product" (integer? (* 2 1/2)) #t)
+(test "22. integer literal" (integer? 4/2) #t)
+(test "23. integer rational" (integer? (rational 6 3)) #t)
+(test "24. integer mod" (integer? (mod 3/2 1/2)) #t)
+(test "25. vector index" (vector-ref (vector 10 20) (* 2 1/2)) 20)
+(test "26. numerator of integer" (numerator 7) 7)
+
+(print "Rational tests completed")
+
+(rational 1 0)
@@ -0,0 +1,13 @@
+;; Reader tests. Forms are evaluated as soon as they are read, so everything
+;; before the unbalanced expression at the end still runs.
+
+(print "1. brackets" '(1 [2 {3}] (4)))   ; mixed bracket kinds
+(print "2. quotes" ''a '(a 'b))
+(print "3. atoms" nil NIL #t #F -5 0 1.5 -2.5e3 "a;b" 'x-y?)
+(print "4. multi-line"
+    (list 1
+          2
+          3))
+
+(print "5. unbalanced"
+    (list 1 2]
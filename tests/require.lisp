@@ -0,0 +1,14 @@
+;; Modules are loaded once per environment by require
+
+(print (require "tests/modules/greeting.lisp"))
+(greet (car names))
+
+;; Required again, under another name for the same file
+(print (require "tests/modules/greeting.lisp"))
+(print (require "tests/../tests/modules/names.lisp"))
+
+;; load always evaluates the file again
+(load "tests/modules/names.lisp")
+
+;; Requiring a file that does not exist is an error
+(require "tests/modules/missing.lisp")
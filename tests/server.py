@@ -0,0 +1,53 @@
+# encoding: utf-8
+from __future__ import print_function, unicode_literals
+
+'''
+Starts 'zeta.py --serve' with one worker and prints the answers to a few
+requests, including one stuck in a multiplication of huge numbers, which
+budgets cannot interrupt, so it only stops when its worker is replaced, and
+definitions made through eval, which later requests must not see. Run from
+the repository root; compare with tests/server.out.
+'''
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+REQUESTS = [
+    b"(define (sq x) (* x x)) (print 'hi) (sq 12)",
+    b"sq",
+    b"(eval '(define leak 42)) leak",
+    b"leak",
+    b"(map eval '((define mapped 1))) mapped",
+    b"mapped",
+    b"(define (up x n) (if (= n 0) x (up (* x x) (- n 1)))) (up 7 26)",
+    b"(+ 1 2)",
+]
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'zeta.sock')
+    server = subprocess.Popen([sys.executable, 'zeta.py', '--serve', path,
+                               '--jobs', '1', '--timeout', '0.5'])
+    try:
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.1)
+        client = socket.socket(socket.AF_UNIX)
+        client.connect(path)
+        stream = client.makefile('rwb')
+        for request in REQUESTS:
+            stream.write(request + b'\n')
+            stream.flush()
+            print(stream.readline().decode('utf-8').strip())
+        client.close()
+    finally:
+        server.terminate()
+        server.wait()
+        os.rmdir(os.path.dirname(path))
+
+if __name__ == '__main__':
+    main()
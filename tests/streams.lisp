@@ -0,0 +1,43 @@
+;; Streams are lists whose tail is only computed when needed
+
+(define (integers-from n)
+    (cons-stream n (integers-from (+ n 1))))
+
+(define naturals (integers-from 0))
+(print naturals)
+(print (stream-car (stream-cdr (stream-cdr naturals))))
+(print naturals)
+
+;; delay and force
+(define p (delay (begin (print 'computing) 42)))
+(print (promise? p) (promise? 42))
+(print (force p))
+(print (force p))
+(print (force 7))
+
+;; Stream functions work on infinite streams
+(define (square x) (* x x))
+(print (stream->list (stream-take 5 (stream-map square naturals))))
+(print (stream->list (stream-take 5 (stream-filter (lambda (x) (= 0 (mod x 3))) naturals))))
+
+;; And on long ranges without building lists
+(print (stream-foldl + 0 (stream-range 1 100000)))
+(print (stream-foldl + 0 (stream-map square (stream-filter (lambda (x) (= 0 (mod x 2))) (stream-range 1 1000)))))
+(print (stream->list (stream-range 5 1)))
+(print (stream-null? (stream-range 5 1)) (stream-null? naturals))
+
+;; Stream functions also take lists
+(print (stream->list (stream-map square '(1 2 3))))
+(print (stream-foldl + 0 '(1 2 3 4)))
+
+;; Tails made by the stream functions are not memoized: walking the stream
+;; again calls the functions again. Tails made with cons-stream are.
+(define (noisy x) (print "computing" x) x)
+(define mapped (stream-map noisy (stream-range 1 2)))
+(print (stream->list mapped))
+(print (stream->list mapped))
+(define (noisy-range a b)
+    (if (> a b) nil (cons-stream (noisy a) (noisy-range (+ a 1) b))))
+(define built (noisy-range 1 2))
+(print (stream->list built))
+(print (stream->list built))
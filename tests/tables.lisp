@@ -0,0 +1,56 @@
+;; Vectors
+(define v (make-vector 3 0))
+(vector-set! v 0 'a)
+(vector-set! v 2 '(1 2))
+(print v (vector-ref v 0) (vector-length v) (vector? v) (vector? '(1)))
+(print (vector 1 "two" 3/4) (make-vector 2) (vector))
+(print (vector->list (list->vector '(1 2 3))))
+(print (vector-sum (vector 1 2 3)) (vector-dot (vector 1 2) (vector 3 4)))
+
+;; Tables
+(define t (make-table))
+(table-set! t 'apple 3)
+(table-set! t "pear" 5)
+(table-set! t '(1 2) 'list-key)
+(table-set! t 'apple 4)
+(print t)
+(print (table-ref t 'apple) (table-ref t "pear") (table-ref t (list 1 2)))
+(print (table-ref t 'missing) (table-ref t 'missing 'default))
+(print (table-contains? t 'apple) (table-contains? t 'plum) (table-count t))
+(print (table-keys t))
+(table-delete! t 'apple)
+(print (table-keys t) (table? t) (table? v))
+
+;; Counting words with a table
+(define (count-words words)
+    (define counts (make-table))
+    (define (loop ws)
+        (if (null? ws)
+            counts
+            (begin
+                (table-set! counts (car ws) (+ 1 (table-ref counts (car ws) 0)))
+                (loop (cdr ws)))))
+    (loop words))
+(print (count-words '(a b a c b a)))
+
+;; Keys of different types are different keys, even when equal
+(define mixed (make-table))
+(table-set! mixed 1 'int)
+(table-set! mixed 1.0 'float)
+(table-set! mixed #t 'true)
+(table-set! mixed 'apple 'symbol)
+(table-set! mixed "APPLE" 'string)
+(print (table-count mixed) (table-ref mixed 1) (table-ref mixed 1.0) (table-ref mixed #t))
+(print (table-ref mixed 'apple) (table-ref mixed "APPLE") (table-contains? mixed "apple"))
+(table-delete! mixed 1.0)
+(print mixed)
+
+;; Streams with the same first element are different keys
+(define streams (make-table))
+(define s (cons-stream 1 2))
+(table-set! streams s 'a)
+(table-set! streams (cons-stream 1 3) 'b)
+(print (table-count streams) (table-ref streams s) (table-ref streams (cons-stream 1 99)))
+
+;; Errors
+(print (vector-ref v 3))
@@ -0,0 +1,15 @@
+;; Arithmetic takes any number of operands
+(print (+ 1) (+ 1 2) (+ 1 2 3 4 5) (- 10 1 2 3) (* 1 2 3 4) (/ 1 2 4) (// 17 2 2))
+(print (+ 1/2 1/3 1/6) (* 1.5 2))
+
+;; Numeric vectors hold doubles
+(define v (f64vector 1 2 3.5))
+(define w (list->f64vector '(2 2 2)))
+(print v w (f64vector))
+(print (f64vector? v) (f64vector? '(1 2)))
+(print (f64vector-length v) (f64vector-ref v 0) (f64vector-ref v 2))
+(print (f64vector->list w))
+(print (vector-sum v) (vector-dot v w) (vector-sum (f64vector)))
+
+;; Errors
+(print (vector-dot v (f64vector 1)))
@@ -3,15 +3,69 @@ from __future__ import print_function, unicode_literals
 
 if __name__ == '__main__':
     import sys
+    import argparse
     from src.eval import zeta, printError
 
-    if len(sys.argv) > 1:
-        filename = sys.argv[1]
+    parser = argparse.ArgumentParser(description='zeta lisp interpreter')
+    parser.add_argument('filename', nargs='?',
+        help='script to run; starts a repl if omitted')
+    parser.add_argument('--batch', metavar='DIR',
+        help='run every .lisp file under DIR in parallel, each in its own '
+             'environment, and report throughput')
+    parser.add_argument('--serve', metavar='SOCKET',
+        help='serve programs sent one per line to the Unix socket SOCKET')
+    parser.add_argument('--jobs', type=int, metavar='N',
+        help='worker processes for --batch and --serve (default: one per core)')
+    parser.add_argument('--timeout', type=float, default=10.0, metavar='SECONDS',
+        help='longest a --serve request may run (default: 10)')
+    parser.add_argument('--max-steps', type=int, metavar='N',
+        help='stop a script after N closure applications')
+    parser.add_argument('--max-seconds', type=float, metavar='SECONDS',
+        help='stop a script after running this long')
+    parser.add_argument('--max-depth', type=int, metavar='N',
+        help='stop a script that nests more than N non-tail calls')
+    parser.add_argument('--engine', choices=('eval', 'vm'), default='eval',
+        help='evaluate by walking analyzed code (eval, the default) or by '
+             'compiling to bytecode (vm)')
+    parser.add_argument('--cache', metavar='DIR',
+        help='keep parsed copies of loaded and required files in DIR')
+    parser.add_argument('--optimize', action='store_true',
+        help='fold constants and inline car/cdr variants before running')
+    parser.add_argument('--profile', action='store_true',
+        help='profile the script and print a report to stderr')
+    parser.add_argument('--profile-out', metavar='FILE',
+        help='with --profile, also write collapsed stacks to FILE')
+    args = parser.parse_args()
+    limits = {'steps': args.max_steps, 'seconds': args.max_seconds,
+              'depth': args.max_depth}
+
+    if args.cache:
+        from src.image import use_cache_directory
+        use_cache_directory(args.cache)
+
+    if args.batch:
+        from src.batch import run_batch
+        sys.exit(1 if run_batch(args.batch, args.jobs, limits) else 0)
+    if args.serve:
+        from src.server import serve
+        serve(args.serve, args.jobs, args.timeout, limits)
+        sys.exit(0)
+
+    if args.profile:
+        from src import profiler
+        profiler.start()
+
+    if args.filename:
         try:
-            with open(filename) as stream:
-                zeta(stream)
+            with open(args.filename) as stream:
+                zeta(stream, limits, args.optimize, args.engine)
         except IOError as e:
             printError(e)
     else:
-        zeta(sys.stdin)
+        zeta(sys.stdin, limits, args.optimize, args.engine)
 
+    if args.profile:
+        profiler.stop()
+        profiler.report(sys.stderr)
+        if args.profile_out:
+            profiler.save(args.profile_out)